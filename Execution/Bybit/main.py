@@ -1,7 +1,6 @@
 import pandas as pd
 import time
 import datetime
-from pybit.unified_trading import HTTP
 import os
 from dotenv import load_dotenv
 import logging
@@ -18,12 +17,19 @@ load_dotenv()
 API_KEY = os.getenv("BYBIT_API_KEY")
 API_SECRET = os.getenv("BYBIT_SECRET_KEY")
 
-# Initialize Bybit client
-client = HTTP(
-    demo=True,
-    api_key=API_KEY,
-    api_secret=API_SECRET
-)
+# Bybit client, built on first use so importing this script needs neither pybit nor the network
+client = None
+
+def get_client():
+    global client
+    if client is None:
+        from pybit.unified_trading import HTTP
+        client = HTTP(
+            demo=True,
+            api_key=API_KEY,
+            api_secret=API_SECRET
+        )
+    return client
 
 class BybitFetcher:
     def __init__(self, symbol, interval, start_time, end_time="now"):
@@ -62,7 +68,7 @@ class BybitFetcher:
                 break
 
             try:
-                klines = client.get_kline(
+                klines = get_client().get_kline(
                     category="linear",
                     symbol=self.symbol,
                     interval=bybit_interval,
@@ -108,7 +114,7 @@ class BybitFetcher:
 
 def fetch_fees(symbol="BTCUSDT"):
     try:
-        fee_data = client.get_fee_rates(category="linear", symbol=symbol)
+        fee_data = get_client().get_fee_rates(category="linear", symbol=symbol)
         
         if 'result' in fee_data and fee_data['result']['list']:
             taker_fee = float(fee_data['result']['list'][0]['takerFeeRate'])
@@ -124,7 +130,7 @@ def fetch_fees(symbol="BTCUSDT"):
 
 def fetch_current_price(symbol="BTCUSDT"):
     try:
-        ticker = client.get_tickers(category="linear", symbol=symbol)
+        ticker = get_client().get_tickers(category="linear", symbol=symbol)
         price = float(ticker['result']['list'][0]['lastPrice'])
         logging.info(f"Fetched current price for {symbol}: {price}")
         return price
@@ -134,7 +140,7 @@ def fetch_current_price(symbol="BTCUSDT"):
 
 def fetch_balance():
     try:
-        balance_data = client.get_wallet_balance(accountType="UNIFIED")
+        balance_data = get_client().get_wallet_balance(accountType="UNIFIED")
         
         if 'result' not in balance_data or not balance_data['result']['list']:
             logging.error("No balance data found in response")
@@ -183,7 +189,7 @@ def place_order(symbol, side, quantity, price, tp_price, sl_price):
         
         logging.info(f"Placing {side} order: {quantity} BTC at ${price}, TP: ${tp_price}, SL: ${sl_price}")
         
-        order = client.place_order(
+        order = get_client().place_order(
             category="linear",
             symbol=symbol,
             side=side,
@@ -203,7 +209,7 @@ def close_position(symbol, quantity, side="Sell"):
     try:
         quantity = round(quantity, 3)
         
-        order = client.place_order(
+        order = get_client().place_order(
             category="linear",
             symbol=symbol,
             side=side,
@@ -214,7 +220,7 @@ def close_position(symbol, quantity, side="Sell"):
         order_id = order['result']['orderId']
         
         time.sleep(1)
-        order_details = client.get_order_history(category="linear", symbol=symbol, orderId=order_id)
+        order_details = get_client().get_order_history(category="linear", symbol=symbol, orderId=order_id)
         executed_price = float(order_details['result']['list'][0]['avgPrice'])
         
         logging.info(f"Closed position for {symbol}, qty: {quantity}, executed_price: {executed_price}, order_id: {order_id}")
@@ -225,7 +231,7 @@ def close_position(symbol, quantity, side="Sell"):
 
 def get_position(symbol="BTCUSDT"):
     try:
-        positions = client.get_positions(category="linear", symbol=symbol)
+        positions = get_client().get_positions(category="linear", symbol=symbol)
         position_list = positions['result']['list']
         if position_list and float(position_list[0]['size']) > 0:
             return {
@@ -378,7 +384,7 @@ def detect_manual_position_change(symbol, tracked_position, current_pnl_sum, cur
 
         try:
             # Get the most recent orders (both active and history)
-            orders = client.get_order_history(
+            orders = get_client().get_order_history(
                 category="linear",
                 symbol=symbol,
                 limit=5
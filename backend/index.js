@@ -21,6 +21,9 @@ const pool = new Pool({
   port: process.env.PG_PORT,
 });
 
+// "partitioned": backtests live in backtest.trades keyed by strategy_id (see postgress_handler.py)
+const partitionedStorage = (process.env.STRATEGY_STORAGE || "tables").toLowerCase() === "partitioned";
+
 // Initialize user schema and table
 async function initializeUserSchema() {
   try {
@@ -50,39 +53,69 @@ async function initializeUserSchema() {
 // Initialize on startup
 initializeUserSchema();
 
+// Latest pnl_sum of each named strategy, read from its backtest rows
+async function latestPnlByStrategy(names) {
+  if (names.length === 0) return new Map();
+
+  if (partitionedStorage) {
+    // Latest row per strategy in one index scan instead of one query per table
+    const pnlResult = await pool.query(`
+      SELECT DISTINCT ON (strategy_id) strategy_id, pnl_sum
+      FROM backtest.trades
+      WHERE strategy_id = ANY($1)
+      ORDER BY strategy_id, datetime DESC
+    `, [names]);
+    return new Map(pnlResult.rows.map((row) => [row.strategy_id, row.pnl_sum]));
+  }
+
+  const entries = await Promise.all(
+    names.map(async (name) => {
+      try {
+        const tableName = `backtest.${name}`;
+        const pnlResult = await pool.query(`
+          SELECT pnl_sum FROM ${tableName}
+          ORDER BY datetime DESC
+          LIMIT 1
+        `);
+        return [name, pnlResult.rows[0]?.pnl_sum ?? null];
+      } catch (err) {
+        console.error(`Error fetching P&L for ${name}:`, err.message);
+        return [name, null];
+      }
+    })
+  );
+  return new Map(entries);
+}
+
 // API endpoint to fetch all strategies
 app.get("/api/strategies", async (req, res) => {
   try {
-    const result = await pool.query("SELECT * FROM public.strategies_config");
-    const strategies = result.rows;
-
-    const strategiesWithPnl = await Promise.all(
-      strategies.map(async (strategy) => {
-        try {
-          const tableName = `backtest.${strategy.name}`;
-          const pnlResult = await pool.query(`
-            SELECT pnl_sum FROM ${tableName}
-            ORDER BY datetime DESC
-            LIMIT 1
-          `);
-
-          const lastPnl = pnlResult.rows[0]?.pnl_sum ?? null;
-
-          return {
-            ...strategy,
-            pnl: lastPnl,
-          };
-        } catch (err) {
-          console.error(`Error fetching P&L for ${strategy.name}:`, err.message);
-          return {
-            ...strategy,
-            pnl: null,
-          };
-        }
-      })
-    );
+    // One read of the leaderboard that stats/main.py keeps up to date
+    let strategies;
+    try {
+      const leaderboardResult = await pool.query(`
+        SELECT c.*, l.pnl_sum AS pnl, l.balance, l.sharpe_ratio, l.max_drawdown,
+               l.number_of_trades, l.last_trade_at
+        FROM public.strategies_config c
+        LEFT JOIN stats.strategy_leaderboard l ON l.strategy_name = c.name
+      `);
+      strategies = leaderboardResult.rows;
+    } catch (err) {
+      // 42P01: no leaderboard yet (stats job never ran); read the backtests directly
+      if (err.code !== "42P01") throw err;
+      const result = await pool.query("SELECT * FROM public.strategies_config");
+      strategies = result.rows.map((strategy) => ({ ...strategy, pnl: null }));
+    }
+
+    // Strategies the stats job has not reached yet (no leaderboard row, or one only
+    // stamped by a new backtest) take their P&L from the latest backtest row. The other
+    // leaderboard columns stay null until the next stats run.
+    const missing = strategies.filter((strategy) => strategy.pnl == null).map((strategy) => strategy.name);
+    const pnlByStrategy = await latestPnlByStrategy(missing);
 
-    res.json(strategiesWithPnl);
+    res.json(strategies.map((strategy) => (
+      strategy.pnl == null ? { ...strategy, pnl: pnlByStrategy.get(strategy.name) ?? null } : strategy
+    )));
   } catch (err) {
     console.error("Error fetching strategies:", err);
     res.status(500).json({ error: "Failed to fetch strategies" });
@@ -107,23 +140,29 @@ app.get("/api/strategies/:strategyName", async (req, res) => {
     const strategy = configResult.rows[0];
 
     // Get backtest data (ledger)
-    const tableName = `backtest.${strategyName}`;
-    const ledgerResult = await pool.query(`
-      SELECT * FROM ${tableName}
-      ORDER BY datetime ASC
-    `);
+    let ledgerResult;
+    if (partitionedStorage) {
+      ledgerResult = await pool.query(`
+        SELECT datetime, action, buy_price, sell_price, pnl_percent, pnl_sum, balance
+        FROM backtest.trades
+        WHERE strategy_id = $1
+        ORDER BY datetime ASC
+      `, [strategyName]);
+    } else {
+      const tableName = `backtest.${strategyName}`;
+      ledgerResult = await pool.query(`
+        SELECT * FROM ${tableName}
+        ORDER BY datetime ASC
+      `);
+    }
 
-    // Get latest PnL
-    const latestPnlResult = await pool.query(`
-      SELECT pnl_sum FROM ${tableName}
-      ORDER BY datetime DESC
-      LIMIT 1
-    `);
+    // Latest PnL is the last ledger row
+    const ledger = ledgerResult.rows;
 
     res.json({
       strategy,
-      ledger: ledgerResult.rows,
-      currentPnl: latestPnlResult.rows[0]?.pnl_sum || 0,
+      ledger,
+      currentPnl: ledger[ledger.length - 1]?.pnl_sum || 0,
     });
   } catch (err) {
     console.error("Error fetching strategy details:", err);
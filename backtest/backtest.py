@@ -1,10 +1,236 @@
+import numpy as np
 import pandas as pd
 from data.utils.data_saver import DataSaver
 
+ACTIONS = np.array(['buy', 'sell', 'tp', 'sl', 'direction_change'], dtype=object)
+BUY, SELL, TP, SL, DIRECTION_CHANGE = range(len(ACTIONS))
+
+# Values per block in the max-pyramid used by the TP/SL touch search, and queries per search batch
+TOUCH_BLOCK = 16
+TOUCH_BATCH = 65536
+
+def _max_levels(values, block=TOUCH_BLOCK):
+    """[values, block maxima, maxima of those, ...] down to a level of at most `block` entries (NaN ignored)."""
+    levels = [values]
+    while len(levels[-1]) > block:
+        level = levels[-1]
+        padded = np.concatenate([level, np.full(-len(level) % block, -np.inf)])
+        levels.append(np.fmax.reduce(padded.reshape(-1, block), axis=1))
+    return levels
+
+def _search_level(levels, depth, starts, thresholds, limits, block):
+    values = levels[depth]
+    n = len(values)
+    result = np.full(len(starts), n, dtype=np.int64)
+    # Rest of each query's own block
+    block_end = (starts // block + 1) * block
+    offsets = starts[:, None] + np.arange(block)
+    in_range = offsets < np.minimum(np.minimum(block_end, limits), n)[:, None]
+    hits = in_range & (values[np.minimum(offsets, n - 1)] >= thresholds[:, None])
+    found = hits.any(axis=1)
+    result[found] = starts[found] + hits[found].argmax(axis=1)
+
+    # Otherwise: first later block (before the limit) whose maximum reaches the
+    # threshold, then the first value inside it
+    rest = np.flatnonzero(~found & (block_end < np.minimum(limits, n)))
+    if len(rest):
+        blocks = _search_level(
+            levels, depth + 1, block_end[rest] // block, thresholds[rest], (limits[rest] - 1) // block + 1, block
+        )
+        ok = blocks < len(levels[depth + 1])
+        rest, blocks = rest[ok], blocks[ok]
+        offsets = blocks[:, None] * block + np.arange(block)
+        hits = (offsets < n) & (values[np.minimum(offsets, n - 1)] >= thresholds[rest][:, None])
+        result[rest] = blocks * block + hits.argmax(axis=1)
+    return result
+
+def _first_at_least(levels, starts, thresholds, limits, block=TOUCH_BLOCK):
+    """
+    For every query, the first index k in [starts[q], limits[q]) with
+    levels[0][k] >= thresholds[q]. Queries without one get an index >= limits[q].
+    """
+    result = np.empty(len(starts), dtype=np.int64)
+    for lo in range(0, len(starts), TOUCH_BATCH):
+        hi = lo + TOUCH_BATCH
+        result[lo:hi] = _search_level(levels, 0, starts[lo:hi], thresholds[lo:hi], limits[lo:hi], block)
+    return result
+
+def build_trade_events(high, low, signal):
+    """
+    Everything about a signal series that does not depend on tp/sl, shared by every
+    replay of it (see simulate_trades):
+
+    - entries: the only bars a trade can open on, i.e. non-zero signals that differ from
+      the previous bar (a repeated signal is either ignored or already in position);
+    - opposite: per entry, the first later bar with the opposite signal (n if none);
+    - the bars with a zero signal, which are the only bars where TP/SL is checked
+      without also being a direction change, and per entry the range of them before
+      its opposite bar;
+    - max-pyramids over the highs and negated lows of those zero-signal bars.
+    """
+    n = len(signal)
+    previous = np.zeros_like(signal)
+    previous[1:] = signal[:-1]
+    entries = np.flatnonzero((signal != 0) & (signal != previous))
+    direction = signal[entries].astype(np.int8)
+
+    bars = np.arange(n + 1)
+    next_long = np.minimum.accumulate(np.where(np.concatenate([signal == 1, [True]]), bars, n)[::-1])[::-1]
+    next_short = np.minimum.accumulate(np.where(np.concatenate([signal == -1, [True]]), bars, n)[::-1])[::-1]
+    opposite = np.where(direction == 1, next_short[entries + 1], next_long[entries + 1])
+
+    zero_bars = np.flatnonzero(signal == 0)
+    return {
+        'n': n,
+        'entries': entries,
+        'direction': direction,
+        'opposite': opposite,
+        # Entry index reached from each cursor position (the loop's next non-zero signal)
+        'next_entry': np.searchsorted(entries, bars),
+        'zero_bars': zero_bars,
+        'zero_lo': np.searchsorted(zero_bars, entries + 1),
+        'zero_hi': np.searchsorted(zero_bars, opposite),
+        'high_levels': _max_levels(high[zero_bars]),
+        'neg_low_levels': _max_levels(-low[zero_bars]),
+    }
+
+def _exit_bars(events, entry_price, tp, sl):
+    """Exit bar of a trade opened at every entry (n if it never closes) for one tp/sl pair."""
+    long_ = events['direction'] == 1
+    tp_price = np.where(long_, entry_price * (1 + tp), entry_price * (1 - tp))
+    sl_price = np.where(long_, entry_price * (1 - sl), entry_price * (1 + sl))
+    # Long: high >= tp or low <= sl; short: high >= sl or low <= tp
+    up = np.where(long_, tp_price, sl_price)
+    down = np.where(long_, sl_price, tp_price)
+
+    exits = events['opposite'].copy()
+    lo, hi = events['zero_lo'], events['zero_hi']
+    active = np.flatnonzero(lo < hi)
+    if len(active):
+        first = np.minimum(
+            _first_at_least(events['high_levels'], lo[active], up[active], hi[active]),
+            _first_at_least(events['neg_low_levels'], lo[active], -down[active], hi[active]),
+        )
+        touched = first < hi[active]
+        exits[active[touched]] = events['zero_bars'][first[touched]]
+    return exits, tp_price, sl_price
+
+def simulate_trades(open_, high, low, signal, tp, sl, balance, fee_percent, position_size=None, record=True, events=None):
+    """
+    Event-driven replay of Backtester.run on contiguous arrays.
+
+    `signal` is an int8 array of -1/0/1 (missing signals as 0). The exit of a trade
+    opened at every possible entry is resolved for all entries at once (see
+    build_trade_events); the ledger is then the chain entry -> exit -> next entry,
+    walked once per trade. Returns (records, pnl_sum, balance, position_size);
+    `records` holds the ledger arrays, or None when record=False. `events` can be
+    passed in when the same signal is replayed with many tp/sl pairs.
+    """
+    if events is None:
+        events = build_trade_events(high, low, signal)
+    n = events['n']
+    entries = events['entries']
+    entry_price = open_[entries]
+    exits, tp_price, sl_price = _exit_bars(events, entry_price, tp, sl)
+    is_direction_change = exits == events['opposite']
+
+    # A direction change re-enters on the same bar; a TP/SL exit waits for the next one
+    following = events['next_entry'][np.minimum(np.where(is_direction_change, exits, exits + 1), n)]
+    following = following.tolist()
+    exit_list = exits.tolist()
+    chain = []
+    m = len(entries)
+    q = int(events['next_entry'][0])
+    while q < m:
+        chain.append(q)
+        if exit_list[q] >= n:
+            break
+        q = following[q]
+    chain = np.asarray(chain, dtype=np.int64)
+
+    # Exit price and action of every trade in the chain
+    closed = chain[exits[chain] < n]
+    j = exits[closed]
+    long_ = events['direction'][closed] == 1
+    buy = entry_price[closed]
+    high_j, low_j, open_j = high[j], low[j], open_[j]
+    tp_j, sl_j = tp_price[closed], sl_price[closed]
+    sl_hit = np.where(long_, low_j <= sl_j, high_j >= sl_j)
+    tp_hit = np.where(long_, high_j >= tp_j, low_j <= tp_j)
+    exit_price = np.where(sl_hit, np.where(long_, low_j, high_j), np.where(tp_hit, np.where(long_, high_j, low_j), open_j))
+    exit_action = np.where(sl_hit, SL, np.where(tp_hit, TP, DIRECTION_CHANGE))
+    gross = np.where(long_, (exit_price - buy) / buy, (buy - exit_price) / buy)
+    net_list = (gross - fee_percent).tolist()
+
+    # Balance and pnl_sum compound trade by trade, in the same order as the loop engine
+    pnl_sum = 0.0
+    if position_size is None:
+        position_size = balance
+    entry_pnl = -fee_percent * 100
+    pnl_sums, balances = [], []
+    for net in net_list:
+        position_size = balance
+        balance -= fee_percent * position_size
+        pnl_sum += entry_pnl
+        if record:
+            pnl_sums.append(pnl_sum)
+            balances.append(balance)
+        balance += position_size * net
+        pnl_sum += net * 100
+        if record:
+            pnl_sums.append(pnl_sum)
+            balances.append(balance)
+    if len(chain) > len(net_list):
+        # The last trade is still open at the end of the data
+        position_size = balance
+        balance -= fee_percent * position_size
+        pnl_sum += entry_pnl
+        pnl_sums.append(pnl_sum)
+        balances.append(balance)
+
+    records = None
+    if record:
+        # Ledger rows alternate entry, exit (the last trade may have no exit)
+        rows = len(pnl_sums)
+        entry_rows = np.arange(0, rows, 2)
+        exit_rows = np.arange(1, rows, 2)
+        bar = np.empty(rows, dtype=np.int64)
+        action = np.empty(rows, dtype=np.int8)
+        buy_price = np.empty(rows, dtype=np.float64)
+        sell_price = np.empty(rows, dtype=np.float64)
+        pnl_percent = np.empty(rows, dtype=np.float64)
+        bar[entry_rows] = entries[chain]
+        bar[exit_rows] = j
+        action[entry_rows] = np.where(events['direction'][chain] == 1, BUY, SELL)
+        action[exit_rows] = exit_action
+        buy_price[entry_rows] = entry_price[chain]
+        buy_price[exit_rows] = buy
+        sell_price[entry_rows] = 0.0
+        sell_price[exit_rows] = exit_price
+        pnl_percent[entry_rows] = entry_pnl
+        pnl_percent[exit_rows] = (gross - fee_percent) * 100
+        records = {
+            'bar': bar,
+            'action': action,
+            'buy_price': buy_price,
+            'sell_price': sell_price,
+            'pnl_percent': pnl_percent,
+            'pnl_sum': np.asarray(pnl_sums, dtype=np.float64),
+            'balance': np.asarray(balances, dtype=np.float64),
+        }
+    return records, pnl_sum, balance, position_size
+
 class Backtester:
-    def __init__(self, ohlcv_df, signals_df, tp=0.05, sl=0.03, initial_balance=1000, fee_percent=0.0005):
+    def __init__(self, ohlcv_df, signals_df, tp=0.05, sl=0.03, initial_balance=1000, fee_percent=0.0005, engine='loop', merge_dump_path=None):
+        """
+        engine='loop' walks the merged frame row by row; engine='array' replays the
+        same TP/SL/direction-change semantics on NumPy arrays (see simulate_trades).
+        merge_dump_path, if set, saves the merged frame of the loop engine as CSV for debugging.
+        """
         self.ohlcv = ohlcv_df.copy()
         self.signals = signals_df.copy()
+        self.engine = engine
+        self.merge_dump_path = merge_dump_path
         self.tp = tp
         self.sl = sl
         self.balance = initial_balance
@@ -36,9 +262,110 @@ class Backtester:
         
         return df
 
+    def prepare_arrays(self):
+        """
+        Align signals to the OHLCV bars (same floor-to-minute left join as merge_data)
+        and return contiguous (datetime, open, high, low, signal) arrays.
+        """
+        ohlcv = self.ohlcv
+        signals = self.signals
+        ohlcv_times = ohlcv.index if ohlcv.index.name == 'datetime' else ohlcv['datetime']
+        signal_times = signals.index if signals.index.name == 'datetime' else signals['datetime']
+        times = pd.DatetimeIndex(pd.to_datetime(ohlcv_times)).floor('min')
+        signal_times = pd.DatetimeIndex(pd.to_datetime(signal_times)).floor('min')
+        signal_col = 'final_signal' if 'final_signal' in signals.columns else 'signal'
+
+        if signal_times.is_unique:
+            positions = signal_times.get_indexer(times)
+            values = signals[signal_col].to_numpy(dtype=np.float64)
+            signal = np.where(positions >= 0, values[positions], np.nan)
+            open_ = ohlcv['open'].to_numpy(dtype=np.float64)
+            high = ohlcv['high'].to_numpy(dtype=np.float64)
+            low = ohlcv['low'].to_numpy(dtype=np.float64)
+        else:
+            # Duplicate signal timestamps multiply rows in the join; keep merge semantics
+            df = self.merge_data()
+            times = df.index
+            signal = df['signal'].to_numpy(dtype=np.float64)
+            open_ = df['open'].to_numpy(dtype=np.float64)
+            high = df['high'].to_numpy(dtype=np.float64)
+            low = df['low'].to_numpy(dtype=np.float64)
+
+        # Only exact 1/-1 open or reverse positions; NaN and anything else count as no signal
+        signal = np.where(signal == 1, 1, np.where(signal == -1, -1, 0)).astype(np.int8)
+        return (
+            times,
+            np.ascontiguousarray(open_),
+            np.ascontiguousarray(high),
+            np.ascontiguousarray(low),
+            signal,
+        )
+
     def run(self):
+        if self.engine == 'array':
+            return self.run_array()
+        return self.run_loop()
+
+    def _ledger(self, times, records):
+        if len(records['bar']) == 0:
+            return pd.DataFrame()
+        return pd.DataFrame({
+            'datetime': times[records['bar']],
+            'action': ACTIONS[records['action']],
+            'buy_price': records['buy_price'],
+            'sell_price': records['sell_price'],
+            'pnl_percent': records['pnl_percent'],
+            'pnl_sum': records['pnl_sum'],
+            'balance': records['balance'],
+        })
+
+    def run_array(self):
+        # No stored signals: nothing to align or trade, same empty ledger as run_loop
+        if len(self.signals) == 0:
+            return pd.DataFrame()
+        times, open_, high, low, signal = self.prepare_arrays()
+        records, _, self.balance, self.position_size = simulate_trades(
+            open_, high, low, signal, self.tp, self.sl, self.balance, self.fee_percent, self.position_size
+        )
+        return self._ledger(times, records)
+
+    def run_grid(self, tp_sl_pairs, return_best=False):
+        """
+        Evaluate many (tp, sl) pairs against the same OHLCV + signal series.
+        Signal alignment, entry bars, opposite-signal bars and the TP/SL search pyramids
+        are built once (build_trade_events); each pair then only resolves its TP/SL
+        touches, vectorized over all entries, and walks its trade chain.
+        Returns one row per pair with the final pnl_sum and balance; with
+        return_best=True also the ledger of the best pair (first one on ties), so it
+        does not need to be backtested again.
+        """
+        if len(self.signals) == 0:
+            grid = pd.DataFrame(
+                [{'tp': tp, 'sl': sl, 'pnl_sum': 0.0, 'balance': self.initial_balance} for tp, sl in tp_sl_pairs],
+                columns=['tp', 'sl', 'pnl_sum', 'balance']
+            )
+            return (grid, pd.DataFrame()) if return_best else grid
+        times, open_, high, low, signal = self.prepare_arrays()
+        events = build_trade_events(high, low, signal)
+        rows = []
+        best_pnl, best_records = None, None
+        for tp, sl in tp_sl_pairs:
+            records, pnl_sum, balance, _ = simulate_trades(
+                open_, high, low, signal, tp, sl, self.initial_balance, self.fee_percent,
+                record=return_best, events=events
+            )
+            rows.append({'tp': tp, 'sl': sl, 'pnl_sum': pnl_sum, 'balance': balance})
+            if return_best and (best_pnl is None or pnl_sum > best_pnl):
+                best_pnl, best_records = pnl_sum, records
+        grid = pd.DataFrame(rows, columns=['tp', 'sl', 'pnl_sum', 'balance'])
+        if not return_best:
+            return grid
+        return grid, (self._ledger(times, best_records) if best_records is not None else pd.DataFrame())
+
+    def run_loop(self):
         df = self.merge_data()
-        DataSaver.save_to_csv(df, "Merge.csv")
+        if self.merge_dump_path:
+            DataSaver.save_to_csv(df, self.merge_dump_path)
         in_position = False
         position_type = None
         entry_price = 0.0
@@ -163,3 +490,81 @@ class Backtester:
                     })
 
         return pd.DataFrame(results)
+
+
+def check_parity(ohlcv_df, signals_df, **kwargs):
+    """Run both engines on the same inputs and return True when the trade ledgers match exactly."""
+    loop_result = Backtester(ohlcv_df, signals_df, engine='loop', **kwargs).run_loop()
+    array_result = Backtester(ohlcv_df, signals_df, engine='array', **kwargs).run_array()
+    if loop_result.empty or array_result.empty:
+        return loop_result.empty and array_result.empty
+    if list(loop_result.columns) != list(array_result.columns) or len(loop_result) != len(array_result):
+        return False
+    return all(
+        np.array_equal(loop_result[col].to_numpy(), array_result[col].to_numpy())
+        for col in loop_result.columns
+    )
+
+
+if __name__ == "__main__":
+    # Parity check of the array engine against the loop engine on synthetic random walks
+    import time
+    rng = np.random.default_rng(0)
+
+    def random_walk(n):
+        close = 100 * np.exp(np.cumsum(rng.standard_normal(n) * 0.001))
+        open_ = np.concatenate([[close[0]], close[:-1]])
+        return pd.DataFrame({
+            'datetime': pd.date_range("2024-01-01", periods=n, freq="min"),
+            'open': open_,
+            'high': np.maximum(open_, close) * (1 + rng.random(n) * 0.002),
+            'low': np.minimum(open_, close) * (1 - rng.random(n) * 0.002),
+            'close': close,
+            'volume': rng.random(n),
+        })
+
+    ohlcv = random_walk(200_000)
+    n = len(ohlcv)
+    # Sparse signals on a subset of bars, with gaps left unmatched (NaN after the join)
+    signal_bars = np.sort(rng.choice(n, n // 3, replace=False))
+    sparse = pd.DataFrame({
+        'datetime': ohlcv['datetime'].iloc[signal_bars].to_numpy(),
+        'final_signal': rng.choice([-1, 0, 0, 0, 1], len(signal_bars)),
+    }).set_index('datetime')
+    # Dense MA-crossover signal: every bar is long or short
+    ohlcv_dense = random_walk(500_000)
+    fast, slow = ohlcv_dense['close'].rolling(20).mean(), ohlcv_dense['close'].rolling(100).mean()
+    dense = pd.DataFrame({
+        'datetime': ohlcv_dense['datetime'],
+        'final_signal': np.where(fast > slow, 1, -1),
+    }).set_index('datetime')
+
+    cases = [("sparse 200k", ohlcv, sparse, 0.05, 0.03), ("sparse 200k", ohlcv, sparse, 0.002, 0.001),
+             ("dense 500k", ohlcv_dense, dense, 0.05, 0.03), ("dense 500k", ohlcv_dense, dense, 0.002, 0.001)]
+    for name, prices, signals, tp, sl in cases:
+        started = time.perf_counter()
+        Backtester(prices, signals, tp=tp, sl=sl, engine='loop').run_loop()
+        loop_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        Backtester(prices, signals, tp=tp, sl=sl, engine='array').run_array()
+        array_seconds = time.perf_counter() - started
+        print(f"{name} tp={tp} sl={sl} parity={check_parity(prices, signals, tp=tp, sl=sl)} "
+              f"loop={loop_seconds:.2f}s array={array_seconds:.3f}s")
+
+    # Strategies without stored signals, or whose signals are all NaN, trade nothing
+    empty = sparse.iloc[:0]
+    all_nan = sparse.assign(final_signal=np.nan)
+    for name, signals in [("empty signals", empty), ("all-NaN signals", all_nan)]:
+        grid, best_results = Backtester(ohlcv, signals).run_grid([(0.05, 0.03)], return_best=True)
+        print(f"{name}: parity={check_parity(ohlcv, signals)} "
+              f"grid pnl={grid['pnl_sum'].tolist()} best ledger empty={best_results.empty}")
+
+    # A 6x5 exit grid shares the signal events; the best ledger comes back with it
+    pairs = [(tp, sl) for tp in [0.01, 0.02, 0.03, 0.05, 0.075, 0.10] for sl in [0.01, 0.02, 0.03, 0.04, 0.05]]
+    for name, prices, signals in [("sparse 200k", ohlcv, sparse), ("dense 500k", ohlcv_dense, dense)]:
+        started = time.perf_counter()
+        grid, best_results = Backtester(prices, signals).run_grid(pairs, return_best=True)
+        grid_seconds = time.perf_counter() - started
+        best = grid.loc[grid['pnl_sum'].idxmax()]
+        rerun = Backtester(prices, signals, tp=best['tp'], sl=best['sl'], engine='array').run_array()
+        print(f"{name} grid of {len(pairs)} pairs: {grid_seconds:.2f}s, best ledger matches a rerun: {rerun.equals(best_results)}")
@@ -22,7 +22,7 @@ def main(strategy_name: str):
     
     print("Backtesting started")
     # Instantiate backtester
-    backtester = Backtester(ohlcv_df=ohlcv, signals_df=signals)
+    backtester = Backtester(ohlcv_df=ohlcv, signals_df=signals, engine='array')
 
     # Run backtest
     result = backtester.run()
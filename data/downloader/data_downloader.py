@@ -1,14 +1,17 @@
 #data/downloader
+import os
+import numpy as np
 import pandas as pd
 import configparser
 import datetime
+from sqlalchemy import text
 from data.utils.data_saver import DataSaver
 from data.utils.postgress_connection import PostgresConnection
 from data.fetch.binance.binance_fetch import BinanceFetcher
 from data.fetch.bybit.bybit_fetch import BybitFetcher
 from data.utils.postgress_dataSave import DatabaseManager
 from data.validate.data_validator import DataValidator
-from data.utils.interval_mapper import map_to_pandas_freq
+from data.utils.interval_mapper import divides_day, resample_ohlcv
 
 def load_config(config_path="E:\\Neurog\\New\\cryptoPipeline\\data\\config.ini"):
     config = configparser.ConfigParser()
@@ -22,35 +25,174 @@ def load_config(config_path="E:\\Neurog\\New\\cryptoPipeline\\data\\config.ini")
 
     return exchange.lower(), symbol.upper(), time_horizon, start_date, end_date
 
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
 class DataDownloader:
     def __init__(self):
         # Initialize PostgresConnection
         self.pg_conn = PostgresConnection()
         self.engine = self.pg_conn.get_engine()
+        # Optional local Parquet tier, enabled by LOCAL_STORE_DIR (needs pyarrow)
+        self.store = None
+        store_dir = os.getenv("LOCAL_STORE_DIR")
+        if store_dir:
+            from data.utils.parquet_store import ParquetStore
+            self.store = ParquetStore(store_dir)
+        # Full month verification of the store against Postgres runs at most this often,
+        # unless a newer gap report or a wider requested range calls for it earlier
+        self.store_verify_hours = float(os.getenv("LOCAL_STORE_VERIFY_HOURS", "24"))
 
     def _format_table_name(self, exchange, symbol, interval):
         return f"{exchange.lower()}_data.{symbol.lower()}_{interval}"
 
-    def download(self, exchange, symbol, base_interval="1m", start_date="2020-01-01", end_date=None):
+    def _build_range_query(self, table_name, start_date, end_date, columns=None):
+        """
+        Build a parameterized range query so the datetime bounds and the selected
+        columns are applied by PostgreSQL (using the datetime index) instead of pandas.
+        """
+        if columns is None:
+            columns = OHLCV_COLUMNS
+        select_cols = ", ".join(["datetime"] + [col for col in columns if col != "datetime"])
+
+        conditions = []
+        params = {}
+        if start_date:
+            conditions.append("datetime >= :start_date")
+            params["start_date"] = pd.to_datetime(start_date).to_pydatetime()
+        if end_date:
+            conditions.append("datetime <= :end_date")
+            params["end_date"] = pd.to_datetime(end_date).to_pydatetime()
+
+        query = f"SELECT {select_cols} FROM {table_name}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY datetime"
+        return text(query), params
+
+    def _month_summaries(self, table_name, months):
+        """
+        {"YYYY-MM": (rows, first, last, close_sum)} per month of `months` that has rows in
+        Postgres, computed in one grouped range scan over the datetime index.
+        """
+        start = pd.Period(months[0], freq="M").start_time.to_pydatetime()
+        end = (pd.Period(months[-1], freq="M") + 1).start_time.to_pydatetime()
+        query = text(
+            f"SELECT to_char(datetime, 'YYYY-MM') AS month, count(*) AS rows, min(datetime) AS first, "
+            f"max(datetime) AS last, sum(close) AS close_sum FROM {table_name} "
+            f"WHERE datetime >= :start_date AND datetime < :end_date GROUP BY 1"
+        )
+        df = pd.read_sql(query, self.engine, params={"start_date": start, "end_date": end}, parse_dates=["first", "last"])
+        return {
+            row.month: (int(row.rows), pd.Timestamp(row.first), pd.Timestamp(row.last), float(row.close_sum))
+            for row in df.itertuples(index=False)
+        }
+
+    @staticmethod
+    def _same_summary(a, b):
+        if a is None or b is None:
+            return a is b
+        return a[:3] == b[:3] and np.isclose(a[3], b[3], rtol=1e-9, atol=1e-6)
+
+    def _latest_gap_report(self, exchange, symbol, interval):
+        """validated_at of the newest gap report for the table (data/main.py writes one per ingest), or None."""
+        try:
+            df = pd.read_sql(
+                text(f"SELECT max(validated_at) AS validated_at FROM {exchange.lower()}_data.gap_reports WHERE table_name = :table_name"),
+                self.engine, params={"table_name": f"{symbol.lower()}_{interval}"}
+            )
+        except Exception:
+            # No gap_reports table yet
+            return None
+        value = df["validated_at"].iloc[0]
+        return None if pd.isna(value) else pd.Timestamp(value).isoformat()
+
+    def _sync_store(self, exchange, symbol, interval, start_date, end_date):
+        """
+        Bring the local store in line with Postgres for the months of [start_date, end_date].
+        Rows newer than the store's latest candle are always appended. Older history is
+        verified only when due: the months were never verified or only a narrower range
+        was, a gap report newer than the last verification exists (an ingest or repair
+        ran), or the last verification is older than LOCAL_STORE_VERIFY_HOURS. Then any
+        month whose row count, first/last candle or close sum differs from Postgres is
+        re-read and replaced as a whole.
+        """
+        table_name = self._format_table_name(exchange, symbol, interval)
+        latest = self.store.latest_timestamp(exchange, symbol, interval)
+        query, params = self._build_range_query(table_name, latest, None)
+        df_new = pd.read_sql(query, self.engine, params=params, parse_dates=["datetime"])
+        if not df_new.empty:
+            print(f"Syncing {len(df_new)} rows from {table_name} to the local store")
+            self.store.write(exchange, symbol, interval, df_new.set_index("datetime"))
+
+        months = list(pd.period_range(pd.to_datetime(start_date), pd.to_datetime(end_date), freq="M").strftime("%Y-%m"))
+        if not months:
+            return
+        gap_report_at = self._latest_gap_report(exchange, symbol, interval)
+        verified = self.store.verification(exchange, symbol, interval)
+        if verified is not None:
+            age_hours = (datetime.datetime.now() - datetime.datetime.fromisoformat(verified["verified_at"])).total_seconds() / 3600
+            if (verified["first_month"] <= months[0] and months[-1] <= verified["last_month"]
+                    and verified["gap_report_at"] == gap_report_at and age_hours < self.store_verify_hours):
+                return
+        self._verify_store_months(exchange, symbol, interval, table_name, months)
+        self.store.mark_verified(
+            exchange, symbol, interval, verified_at=datetime.datetime.now().isoformat(),
+            first_month=months[0], last_month=months[-1], gap_report_at=gap_report_at
+        )
+
+    def _verify_store_months(self, exchange, symbol, interval, table_name, months):
+        """Replace the store months whose summary differs from Postgres."""
+        db_summaries = self._month_summaries(table_name, months)
+        store_summaries = self.store.month_summaries(exchange, symbol, interval, months)
+        stale = [
+            month for month in months
+            if not self._same_summary(db_summaries.get(month), store_summaries.get(month))
+        ]
+        if not stale:
+            return
+
+        conditions = []
+        params = {}
+        for i, month in enumerate(stale):
+            period = pd.Period(month, freq="M")
+            conditions.append(f"(datetime >= :start_{i} AND datetime < :end_{i})")
+            params[f"start_{i}"] = period.start_time.to_pydatetime()
+            params[f"end_{i}"] = (period + 1).start_time.to_pydatetime()
+        query = text(
+            f"SELECT datetime, {', '.join(OHLCV_COLUMNS)} FROM {table_name} "
+            f"WHERE {' OR '.join(conditions)} ORDER BY datetime"
+        )
+        df_changed = pd.read_sql(query, self.engine, params=params, parse_dates=["datetime"])
+        print(f"Resyncing {len(stale)} month(s) of {table_name} that changed in Postgres: {', '.join(stale)}")
+        self.store.replace_months(exchange, symbol, interval, stale, df_changed.set_index("datetime"))
+
+    def _download_from_store(self, exchange, symbol, interval, start_date, end_date, columns):
+        try:
+            self._sync_store(exchange, symbol, interval, start_date, end_date)
+            return self.store.read(exchange, symbol, interval, start_date, end_date, columns)
+        except Exception as e:
+            print(f"Local store unavailable for {exchange} {symbol} {interval}, reading Postgres: {e}")
+            return None
+
+    def download(self, exchange, symbol, base_interval="1m", start_date="2020-01-01", end_date=None, columns=None):
         if end_date is None:
             end_date = datetime.datetime.now().strftime("%Y-%m-%d")
         table_name = self._format_table_name(exchange, symbol, base_interval)
+        if self.store is not None:
+            df = self._download_from_store(exchange, symbol, base_interval, start_date, end_date, columns)
+            if df is not None and not df.empty:
+                print(f"Loaded {len(df)} rows for {table_name} from the local store")
+                return df
         print(f"Downloading data from table: {table_name}")
         try:
-            df = pd.read_sql(f"SELECT * FROM {table_name}", self.engine, parse_dates=["datetime"])
-
-            # Apply filtering based on start_date and end_date
-            df = df[(df["datetime"] >= pd.to_datetime(start_date))]
-            if end_date:
-                df = df[df["datetime"] <= pd.to_datetime(end_date)]
+            query, params = self._build_range_query(table_name, start_date, end_date, columns)
+            df = pd.read_sql(query, self.engine, params=params, parse_dates=["datetime"])
 
             df.set_index("datetime", inplace=True)
             return df
         except Exception as e:
             print(f"Error reading table '{table_name}': {e}")
             df = pd.DataFrame()
-        finally:
-            self.engine.dispose()
 
         if df.empty and start_date and end_date:
             print(f"No data found in {table_name}. Attempting to fetch...")
@@ -67,10 +209,11 @@ class DataDownloader:
 
             if not df.empty:
                 validator = DataValidator(df, "1m")
-                clean_df = validator.clean()
+                clean_df, gap_report = validator.repair_gaps()
                 # Save fetched data to PostgreSQL
                 db = DatabaseManager()
                 db.save_dataframe(clean_df, exchange, symbol, base_interval)
+                db.save_gap_report(gap_report, exchange, symbol, base_interval)
                 db.close()
                 return clean_df
                 
@@ -82,21 +225,39 @@ class DataDownloader:
 
     def resample(self, df, custom_interval):
         print(f"Resampling data to: {custom_interval}")
-        pandas_freq = map_to_pandas_freq(custom_interval)
-        df_resampled = df.resample(pandas_freq).agg({
-            'open': 'first',
-            'high': 'max',
-            'low': 'min',
-            'close': 'last',
-            'volume': 'sum'
-        })
-
-      
-        df_resampled = df_resampled.round(3)
-        df_resampled.reset_index(inplace=True)
-        df_resampled.dropna(inplace=True)
-
-        return df_resampled
+        return resample_ohlcv(df, custom_interval)
+
+    def download_horizon(self, exchange, symbol, interval, start_date="2020-01-01", end_date=None):
+        """
+        Candles at `interval`: the 1m frame for "1m", otherwise the derived horizon table
+        that data/main.py maintains, falling back to resampling 1m when it is not available.
+        Non-1m horizons come back with datetime as a column, as resample() returns them.
+        """
+        if interval == "1m":
+            return self.download(exchange, symbol, "1m", start_date, end_date)
+
+        if divides_day(interval):
+            if end_date is None:
+                end_date = datetime.datetime.now().strftime("%Y-%m-%d")
+            table_name = self._format_table_name(exchange, symbol, interval)
+            df = None
+            if self.store is not None:
+                df = self._download_from_store(exchange, symbol, interval, start_date, end_date, None)
+            if df is None or df.empty:
+                try:
+                    query, params = self._build_range_query(table_name, start_date, end_date)
+                    df = pd.read_sql(query, self.engine, params=params, parse_dates=["datetime"]).set_index("datetime")
+                except Exception as e:
+                    print(f"No derived table '{table_name}' ({e}), resampling 1m instead")
+                    df = None
+            if df is not None and not df.empty:
+                print(f"Loaded {len(df)} {interval} candles from {table_name}")
+                return df.reset_index()
+
+        df_1m = self.download(exchange, symbol, "1m", start_date, end_date)
+        if df_1m is None or df_1m.empty:
+            return df_1m
+        return self.resample(df_1m, interval)
 
 
 if __name__ == "__main__":
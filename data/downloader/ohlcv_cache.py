@@ -0,0 +1,55 @@
+#data/downloader/ohlcv_cache.py
+from data.utils.lru_cache import LRUCache
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class OHLCVCache:
+    """
+    Read-through cache in front of DataDownloader.
+
+    Frames are keyed by (exchange, symbol, interval, start, end). A horizon is
+    resampled from the 1m frame when that is already cached (e.g. shared by the
+    parent process), otherwise read via DataDownloader.download_horizon, so a study
+    that asks for the same symbol and horizon on every trial hits the database once.
+    Cached frames are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, downloader, max_mb=1024, base_interval="1m"):
+        self.downloader = downloader
+        self.base_interval = base_interval
+        self.cache = LRUCache(max_bytes=int(max_mb * 1024 * 1024), sizeof=frame_nbytes)
+
+    def _key(self, exchange, symbol, interval, start_date, end_date):
+        return (exchange.lower(), symbol.strip().lower(), interval.strip(), str(start_date), str(end_date))
+
+    def get(self, exchange, symbol, interval, start_date, end_date):
+        key = self._key(exchange, symbol, interval, start_date, end_date)
+        df = self.cache.get(key)
+        if df is not None:
+            return df
+
+        if interval.strip() == self.base_interval:
+            df = self.downloader.download(exchange, symbol, self.base_interval, start_date, end_date)
+        elif self.contains(exchange, symbol, self.base_interval, start_date, end_date):
+            df_base = self.get(exchange, symbol, self.base_interval, start_date, end_date)
+            df = self.downloader.resample(df_base, interval.strip())
+        else:
+            # Read the derived horizon table; DataDownloader resamples 1m if there is none
+            df = self.downloader.download_horizon(exchange, symbol, interval.strip(), start_date, end_date)
+
+        # Empty results are not cached so a later call can retry the download
+        if df is not None and not df.empty:
+            self.cache.put(key, df)
+        return df
+
+    def contains(self, exchange, symbol, interval, start_date, end_date):
+        return self._key(exchange, symbol, interval, start_date, end_date) in self.cache
+
+    def put(self, exchange, symbol, interval, start_date, end_date, df):
+        self.cache.put(self._key(exchange, symbol, interval, start_date, end_date), df)
+
+    def clear(self):
+        self.cache.clear()
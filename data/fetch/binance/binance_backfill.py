@@ -0,0 +1,247 @@
+#data/fetch/binance/binance_backfill.py
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# USDT-M futures REST endpoint; point BINANCE_FAPI_URL at a local fake server for testing
+DEFAULT_BASE_URL = os.getenv("BINANCE_FAPI_URL", "https://fapi.binance.com")
+KLINES_PATH = "/fapi/v1/klines"
+
+# Request weight budget per minute for /fapi endpoints
+WEIGHT_PER_MINUTE = 2400
+
+KLINE_COLUMNS = [
+    "datetime", "open", "high", "low", "close", "volume",
+    "close_time", "quote_asset_volume", "num_trades",
+    "taker_buy_base_vol", "taker_buy_quote_vol", "ignore"
+]
+
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000,
+}
+
+
+def kline_weight(limit):
+    """Request weight of GET /fapi/v1/klines for a given limit."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def klines_to_frame(klines):
+    """Raw kline rows -> datetime-indexed float OHLCV frame, as BinanceFetcher returns it."""
+    df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
+    df["datetime"] = pd.to_datetime(df["datetime"], unit="ms")
+    df = df[["datetime", "open", "high", "low", "close", "volume"]]
+    df[["open", "high", "low", "close", "volume"]] = df[["open", "high", "low", "close", "volume"]].astype(float)
+    df[["open", "high", "low", "close", "volume"]] = df[["open", "high", "low", "close", "volume"]].round(3)
+    df.set_index("datetime", inplace=True)
+    return df
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `capacity` tokens, refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class BinanceBackfill:
+    """
+    Concurrent historical kline download.
+
+    [start, end) is split into shards of `limit` candles, so each shard is normally one
+    request. Shards are fetched on a thread pool under a token bucket sized to the
+    exchange weight budget, then stitched, de-duplicated and sorted.
+    """
+
+    def __init__(self, symbol, interval, start_time, end_time="now", base_url=DEFAULT_BASE_URL,
+                 max_workers=8, weight_per_minute=WEIGHT_PER_MINUTE, limit=1000, max_retries=5, timeout=10):
+        symbol = symbol.upper()
+        if not symbol.endswith('USDT'):
+            symbol += 'USDT'
+        if interval not in INTERVAL_MS:
+            raise ValueError(f"Interval '{interval}' not supported for backfill.")
+        self.symbol = symbol
+        self.interval = interval
+        self.start_time = start_time
+        self.end_time = end_time
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.limit = limit
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.weight = kline_weight(limit)
+        # Leave some headroom under the budget for other clients sharing the IP
+        self.bucket = TokenBucket(capacity=weight_per_minute * 0.1, rate=weight_per_minute * 0.9 / 60)
+        self._local = threading.local()
+
+    def _session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def shards(self):
+        """[(start_ms, end_ms)] half-open ranges of at most `limit` candles covering the request."""
+        start_ts = int(pd.to_datetime(self.start_time).timestamp() * 1000)
+        end_ts = int(pd.Timestamp.now().timestamp() * 1000) if self.end_time == "now" else int(pd.to_datetime(self.end_time).timestamp() * 1000)
+        step = INTERVAL_MS[self.interval] * self.limit
+        return [(shard_start, min(shard_start + step, end_ts)) for shard_start in range(start_ts, end_ts, step)]
+
+    def _request(self, params):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire(self.weight)
+            try:
+                response = self._session().get(self.base_url + KLINES_PATH, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise
+                print(f"Request error for {self.symbol} {params['startTime']}: {e}, retrying")
+                time.sleep(2 ** attempt)
+                continue
+
+            if response.status_code in (418, 429) or response.status_code >= 500:
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+                retry_after = float(response.headers.get("Retry-After", 2 ** attempt))
+                print(f"HTTP {response.status_code} for {self.symbol}, backing off {retry_after}s")
+                time.sleep(retry_after)
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    def _fetch_shard(self, shard):
+        shard_start, shard_end = shard
+        rows = []
+        start_ts = shard_start
+        # Usually one request; keeps paging if the exchange returns a short page mid-shard
+        while start_ts < shard_end:
+            klines = self._request({
+                "symbol": self.symbol,
+                "interval": self.interval,
+                "startTime": start_ts,
+                "endTime": shard_end - 1,
+                "limit": self.limit,
+            })
+            if not klines:
+                break
+            rows.extend(klines)
+            start_ts = klines[-1][0] + INTERVAL_MS[self.interval]
+        return rows
+
+    def get_klines(self):
+        shards = self.shards()
+        print(f"Backfilling (Binance) {self.symbol} {self.interval}: {len(shards)} shards on {self.max_workers} threads...")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(self._fetch_shard, shards))
+
+        all_data = [row for rows in results for row in rows]
+        if not all_data:
+            return pd.DataFrame()
+
+        df = klines_to_frame(all_data)
+        df = df[~df.index.duplicated(keep="last")].sort_index()
+
+        # Dropping the last record as often it's incomplete
+        df = df.iloc[:-1]
+
+        print(f"\nFetched {len(df)} rows for {self.symbol} - {self.interval}")
+        return df
+
+
+def serve_fake_klines(port=0, weight_limit=WEIGHT_PER_MINUTE):
+    """
+    Start a local HTTP server answering /fapi/v1/klines with a deterministic random walk.
+    It answers 429 once the per-minute weight exceeds `weight_limit`. Returns the server;
+    its base URL is http://127.0.0.1:<server.server_port>.
+    """
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlparse, parse_qs
+
+    state = {"window": int(time.time() // 60), "weight": 0, "requests": 0, "throttled": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            limit = int(query.get("limit", 500))
+            with lock:
+                window = int(time.time() // 60)
+                if window != state["window"]:
+                    state["window"], state["weight"] = window, 0
+                state["weight"] += kline_weight(limit)
+                state["requests"] += 1
+                over_budget = state["weight"] > weight_limit
+                if over_budget:
+                    state["throttled"] += 1
+            if url.path != KLINES_PATH or over_budget:
+                self.send_response(404 if url.path != KLINES_PATH else 429)
+                self.end_headers()
+                return
+
+            step = INTERVAL_MS[query["interval"]]
+            start = -(-int(query["startTime"]) // step) * step
+            end = int(query.get("endTime", start + step * limit))
+            rows = []
+            for open_time in range(start, end + 1, step)[:limit]:
+                price = 100 + (open_time // step) % 997 / 10
+                rows.append([open_time, str(price), str(price + 1), str(price - 1), str(price + 0.5), "1.0",
+                             open_time + step - 1, "0", 1, "0", "0", "0"])
+            body = json.dumps(rows).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.stats = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    # Backfill 30 days of 1m candles from the local fake server and check the stitched result
+    server = serve_fake_klines()
+    started = time.perf_counter()
+    backfill = BinanceBackfill("BTC", "1m", "2024-01-01", "2024-01-31",
+                               base_url=f"http://127.0.0.1:{server.server_port}")
+    df = backfill.get_klines()
+    elapsed = time.perf_counter() - started
+    expected = pd.date_range("2024-01-01", "2024-01-31", freq="min", inclusive="left")[:-1]
+    print(f"rows={len(df)} contiguous={df.index.equals(expected)} unique={df.index.is_unique} "
+          f"requests={server.stats['requests']} throttled={server.stats['throttled']} elapsed={elapsed:.2f}s")
+    server.shutdown()
@@ -1,16 +1,8 @@
 #data/fetch/binance/binance_fetch.py
 import pandas as pd
 import time
-from binance.client import Client
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-API_KEY = os.getenv("BINANCE_API_KEY")
-API_SECRET = os.getenv("BINANCE_SECRET_KEY")
-
-client = Client(API_KEY, API_SECRET)
+from data.fetch.clients import get_binance_client
+from data.fetch.binance.binance_backfill import BinanceBackfill, klines_to_frame
 
 
 class BinanceFetcher:
@@ -30,6 +22,7 @@ class BinanceFetcher:
         start_ts = int(pd.to_datetime(self.start_time).timestamp() * 1000)
         end_ts = int(pd.Timestamp.now().timestamp() * 1000) if self.end_time == "now" else int(pd.to_datetime(self.end_time).timestamp() * 1000)
 
+        client = get_binance_client()
         while True:
             klines = client.futures_klines(
                 symbol=self.symbol,
@@ -50,23 +43,7 @@ class BinanceFetcher:
                 break
 
         # Convert to DataFrame
-        df = pd.DataFrame(all_data, columns=[
-            "datetime", "open", "high", "low", "close", "volume",
-            "close_time", "quote_asset_volume", "num_trades",
-            "taker_buy_base_vol", "taker_buy_quote_vol", "ignore"
-        ])
-
-        df["datetime"] = pd.to_datetime(df["datetime"], unit="ms")
-        df["close_time"] = pd.to_datetime(df["close_time"], unit="ms")
-       
-
-        df = df[["datetime", "open", "high", "low", "close", "volume"]]
-
-        df[["open", "high", "low", "close", "volume"]] = df[["open", "high", "low", "close", "volume"]].astype(float)
-        df[["open", "high", "low", "close", "volume"]] = df[["open", "high", "low", "close", "volume"]].round(3)
-
-        df.set_index("datetime", inplace=True)
-
+        df = klines_to_frame(all_data)
 
         # Dropping the last record as often it's incomplete
         df = df.iloc[:-1]
@@ -75,9 +52,14 @@ class BinanceFetcher:
 
         return df
 
+    def backfill(self, max_workers=8):
+        """Same frame as get_klines, fetched as concurrent time shards under the weight budget."""
+        return BinanceBackfill(self.symbol, self.interval, self.start_time, self.end_time,
+                               max_workers=max_workers).get_klines()
+
 
 if __name__ == "__main__":
-    fetcher = BinanceFetcher(symbol="BTCUSDT", interval=Client.KLINE_INTERVAL_1MINUTE, start_time="2020-01-01")
+    fetcher = BinanceFetcher(symbol="BTCUSDT", interval="1m", start_time="2020-01-01")
     df = fetcher.get_klines()
 
     print("DataFrame Shape:", df.shape)
@@ -0,0 +1,270 @@
+#data/fetch/bybit/bybit_async_fetch.py
+import os
+import time
+import random
+import asyncio
+import threading
+import aiohttp
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Same host as the pybit demo client BybitFetcher uses; override with BYBIT_REST_URL
+# (e.g. https://api.bybit.com for mainnet, or a local fake)
+DEFAULT_BASE_URL = os.getenv("BYBIT_REST_URL", "https://api-demo.bybit.com")
+KLINE_PATH = "/v5/market/kline"
+
+# Binance-style interval -> (Bybit interval, candle length in ms)
+INTERVAL_MAP = {
+    '1m': ('1', 60_000),
+    '5m': ('5', 300_000),
+    '15m': ('15', 900_000),
+    '30m': ('30', 1_800_000),
+    '1h': ('60', 3_600_000),
+    '4h': ('240', 14_400_000),
+    '1d': ('D', 86_400_000),
+}
+
+
+def klines_to_frame(klines):
+    """Raw Bybit kline rows (any order) -> sorted, datetime-indexed float OHLCV frame."""
+    df = pd.DataFrame(klines, columns=[
+        "datetime", "open", "high", "low", "close", "volume", "turnover"
+    ])
+    df["datetime"] = pd.to_datetime(pd.to_numeric(df["datetime"]), unit="ms")
+    df = df[["datetime", "open", "high", "low", "close", "volume"]]
+    df[["open", "high", "low", "close", "volume"]] = df[["open", "high", "low", "close", "volume"]].astype(float)
+    df[["open", "high", "low", "close", "volume"]] = df[["open", "high", "low", "close", "volume"]].round(3)
+    df = df.sort_values("datetime")
+    df.set_index("datetime", inplace=True)
+    return df
+
+
+class ShardFetchError(Exception):
+    """Raised when some shards still fail after retries; carries them and the partial frame."""
+
+    def __init__(self, failed_shards, partial_df):
+        self.failed_shards = failed_shards
+        self.partial_df = partial_df
+        ranges = ", ".join(
+            f"{pd.to_datetime(start, unit='ms')}..{pd.to_datetime(end, unit='ms')}" for start, end, _ in failed_shards
+        )
+        super().__init__(f"{len(failed_shards)} shard(s) failed: {ranges}")
+
+    def contiguous_prefix(self):
+        """Rows of the partial frame before the first failed shard, i.e. the part without holes."""
+        first_failed = pd.to_datetime(min(start for start, _, _ in self.failed_shards), unit="ms")
+        return self.partial_df[self.partial_df.index < first_failed] if not self.partial_df.empty else self.partial_df
+
+
+class AsyncBybitFetcher:
+    """
+    asyncio kline fetcher for Bybit linear perpetuals.
+
+    [start, end) is split into disjoint windows of `limit` candles. Windows are fetched
+    concurrently (at most `max_concurrency` requests in flight), each paging backwards
+    from its own end like BybitFetcher does, with retries and backoff per window.
+    Windows that still fail are reported in `failed_shards` and, by default, raised as
+    ShardFetchError instead of returning a frame with holes.
+    """
+
+    def __init__(self, symbol, interval, start_time, end_time="now", base_url=DEFAULT_BASE_URL,
+                 max_concurrency=10, limit=1000, max_retries=5, timeout=10, raise_on_failure=True):
+        symbol = symbol.upper()
+        if not symbol.endswith('USDT'):
+            symbol += 'USDT'
+        if interval not in INTERVAL_MAP:
+            raise ValueError(f"Interval '{interval}' not supported by AsyncBybitFetcher.")
+        self.symbol = symbol
+        self.interval = interval
+        self.bybit_interval, self.interval_ms = INTERVAL_MAP[interval]
+        self.start_time = start_time
+        self.end_time = end_time
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.limit = limit
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.raise_on_failure = raise_on_failure
+        self.failed_shards = []
+
+    def shards(self):
+        """[(start_ms, end_ms)] disjoint half-open windows of at most `limit` candles."""
+        start_ts = int(pd.to_datetime(self.start_time).timestamp() * 1000)
+        end_ts = int(pd.Timestamp.now().timestamp() * 1000) if self.end_time == "now" else int(pd.to_datetime(self.end_time).timestamp() * 1000)
+        step = self.interval_ms * self.limit
+        return [(shard_start, min(shard_start + step, end_ts)) for shard_start in range(start_ts, end_ts, step)]
+
+    async def _request(self, session, semaphore, params):
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with semaphore:
+                    async with session.get(self.base_url + KLINE_PATH, params=params) as response:
+                        response.raise_for_status()
+                        payload = await response.json()
+                if payload.get("retCode") != 0:
+                    # 10006 is Bybit's rate-limit code; other codes are retried the same way
+                    raise RuntimeError(f"retCode {payload.get('retCode')}: {payload.get('retMsg')}")
+                return payload["result"]["list"]
+            except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError, KeyError) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = 0.5 * 2 ** attempt + random.random() * 0.25
+                print(f"[Bybit] {self.symbol} window ending {pd.to_datetime(params['end'], unit='ms')}: {e}, retry in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _fetch_shard(self, session, semaphore, shard):
+        shard_start, shard_end = shard
+        rows = []
+        end_ts = shard_end - 1
+        # Bybit returns the newest candles of the window first; page backwards to its start
+        while end_ts >= shard_start:
+            klines = await self._request(session, semaphore, {
+                "category": "linear",
+                "symbol": self.symbol,
+                "interval": self.bybit_interval,
+                "start": shard_start,
+                "end": end_ts,
+                "limit": self.limit,
+            })
+            if not klines:
+                break
+            rows.extend(klines)
+            oldest = int(klines[-1][0])
+            if oldest <= shard_start:
+                break
+            end_ts = oldest - 1
+        return rows
+
+    async def fetch(self):
+        shards = self.shards()
+        print(f"Fetching (Bybit async) {self.symbol} {self.interval}: {len(shards)} windows, {self.max_concurrency} in flight...")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            results = await asyncio.gather(
+                *(self._fetch_shard(session, semaphore, shard) for shard in shards),
+                return_exceptions=True
+            )
+
+        all_data = []
+        self.failed_shards = []
+        for shard, result in zip(shards, results):
+            if isinstance(result, BaseException):
+                self.failed_shards.append((shard[0], shard[1], repr(result)))
+            else:
+                all_data.extend(result)
+
+        df = klines_to_frame(all_data) if all_data else pd.DataFrame()
+        if not df.empty:
+            df = df[~df.index.duplicated(keep="last")]
+            # Dropping the last record as it may be incomplete
+            df = df.iloc[:-1]
+
+        if self.failed_shards:
+            error = ShardFetchError(self.failed_shards, df)
+            if self.raise_on_failure:
+                raise error
+            print(f"[Bybit] Warning: {error}")
+
+        print(f"Fetched {len(df)} rows for {self.symbol} - {self.interval}")
+        return df
+
+    def get_klines(self):
+        """Blocking wrapper around fetch() for synchronous callers."""
+        return asyncio.run(self.fetch())
+
+
+def serve_fake_klines(port=0, page_size=200, flaky=True, broken_starts=()):
+    """
+    Start a local HTTP server answering /v5/market/kline like Bybit: newest candles first,
+    but at most `page_size` per page so callers have to page. When `flaky`, every 6th
+    request answers retCode 10006 (rate limited) and every 6th, offset by two, HTTP 503;
+    requests whose `start` is in `broken_starts` always get 503. Returns the server; its base URL is
+    http://127.0.0.1:<server.server_port>.
+    """
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlparse, parse_qs
+
+    intervals = dict(INTERVAL_MAP.values())
+    broken_starts = set(broken_starts)
+    state = {"requests": 0, "rate_limited": 0, "server_errors": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload=None):
+            body = json.dumps(payload).encode() if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path != KLINE_PATH:
+                return self._send(404)
+            with lock:
+                state["requests"] += 1
+                n = state["requests"]
+                server_error = (flaky and n % 6 == 5) or int(query["start"]) in broken_starts
+                rate_limited = flaky and not server_error and n % 6 == 3
+                state["server_errors"] += server_error
+                state["rate_limited"] += rate_limited
+            if server_error:
+                return self._send(503)
+            if rate_limited:
+                return self._send(200, {"retCode": 10006, "retMsg": "Too many visits!", "result": {}})
+
+            step = intervals[query["interval"]]
+            start = -(-int(query["start"]) // step) * step
+            end = int(query["end"]) // step * step
+            limit = min(int(query.get("limit", 200)), page_size)
+            rows = []
+            for open_time in range(end, start - 1, -step)[:limit]:
+                price = 100 + (open_time // step) % 997 / 10
+                rows.append([str(open_time), str(price), str(price + 1), str(price - 1), str(price + 0.5), "1.0", "100.0"])
+            self._send(200, {"retCode": 0, "retMsg": "OK", "result": {"list": rows}})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.stats = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    # Fetch a week of 1m candles from the local fake server: short pages, 10006 and 503
+    # answers must all be absorbed by paging and retries
+    server = serve_fake_klines()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    started = time.perf_counter()
+    fetcher = AsyncBybitFetcher(symbol="BTCUSDT", interval="1m", start_time="2024-01-01", end_time="2024-01-08",
+                                base_url=base_url)
+    df = fetcher.get_klines()
+    expected = pd.date_range("2024-01-01", periods=7 * 1440 - 1, freq="min")
+    print(f"Shape: {df.shape}, complete: {df.index.equals(expected)}, {time.perf_counter() - started:.2f}s, "
+          f"server: {server.stats}")
+    server.shutdown()
+
+    # One window the server never answers: after its retries it must surface as ShardFetchError
+    fetcher = AsyncBybitFetcher(symbol="BTCUSDT", interval="1m", start_time="2024-01-01", end_time="2024-01-08",
+                                max_retries=2)
+    broken = fetcher.shards()[3]
+    server = serve_fake_klines(flaky=False, broken_starts=[broken[0]])
+    fetcher.base_url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        fetcher.get_klines()
+        print("ShardFetchError raised: False")
+    except ShardFetchError as e:
+        failed = [(start, end) for start, end, _ in e.failed_shards]
+        prefix = e.contiguous_prefix()
+        print(f"ShardFetchError raised: True ({e}); only the broken window failed: {failed == [broken]}, "
+              f"partial frame has {len(e.partial_df)} rows, {len(prefix)} of them before the hole "
+              f"(ends {prefix.index[-1]})")
+    server.shutdown()
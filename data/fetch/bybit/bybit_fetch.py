@@ -1,20 +1,7 @@
 import pandas as pd
 import time
 import datetime
-from pybit.unified_trading import HTTP
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-API_KEY = os.getenv("BYBIT_API_KEY")
-API_SECRET = os.getenv("BYBIT_SECRET_KEY")
-
-client = HTTP(
-    demo=True,
-    api_key=API_KEY,
-    api_secret=API_SECRET
-)
+from data.fetch.clients import get_bybit_client
 
 class BybitFetcher:
     def __init__(self, symbol, interval, start_time, end_time="now"):
@@ -61,7 +48,7 @@ class BybitFetcher:
             print(f"[DEBUG] Iteration {iteration}: Fetching data from {pd.to_datetime(start_ts, unit='ms')} to {pd.to_datetime(end_ts, unit='ms')}")
             try:
                 print(f"[DEBUG] Making API call with symbol={self.symbol}, interval={bybit_interval}, start={start_ts}, end={end_ts}, limit={limit}")
-                klines = client.get_kline(
+                klines = get_bybit_client().get_kline(
                     category="linear",
                     symbol=self.symbol,
                     interval=bybit_interval,
@@ -0,0 +1,35 @@
+#data/fetch/clients.py
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Clients for the data pipeline (fetchers, downloader): one per process and configuration,
+# created on first use. Both SDKs keep a requests session inside the client, so reusing it
+# also reuses pooled connections. Execution/ scripts run standalone and build their own.
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_binance_client():
+    """Shared python-binance Client; the SDK is imported and the client built on first call."""
+    with _lock:
+        if "binance" not in _clients:
+            from binance.client import Client
+            _clients["binance"] = Client(os.getenv("BINANCE_API_KEY"), os.getenv("BINANCE_SECRET_KEY"))
+        return _clients["binance"]
+
+
+def get_bybit_client(demo=True):
+    """Shared pybit unified-trading HTTP client (demo account by default), built on first call."""
+    key = ("bybit", demo)
+    with _lock:
+        if key not in _clients:
+            from pybit.unified_trading import HTTP
+            _clients[key] = HTTP(
+                demo=demo,
+                api_key=os.getenv("BYBIT_API_KEY"),
+                api_secret=os.getenv("BYBIT_SECRET_KEY")
+            )
+        return _clients[key]
@@ -1,6 +1,6 @@
 import configparser
-from data.fetch.binance.binance_fetch import BinanceFetcher
-from data.fetch.bybit.bybit_fetch import BybitFetcher
+from data.fetch.binance.binance_backfill import BinanceBackfill
+from data.fetch.bybit.bybit_async_fetch import AsyncBybitFetcher, ShardFetchError
 from data.validate.data_validator import DataValidator
 from data.utils.postgress_dataSave import DatabaseManager
 from datetime import datetime
@@ -18,16 +18,22 @@ def load_config(config_path="E:\\Neurog\\New\\cryptoPipeline\\data\\config.ini")
     time_horizon = config["DEFAULT"]["time_horizons"]
     start_date = config["DEFAULT"]["start_date"]
     end_date = config["DEFAULT"]["end_date"]
+    derived_horizons = [h.strip() for h in config["DEFAULT"].get("derived_horizons", "").split(",") if h.strip()]
 
     # Parse comma-separated exchanges and symbols
     exchanges = [e.strip().lower() for e in exchange.split(",")]
     symbols = [s.strip().upper() for s in symbols.split(",")]
     
 
-    return exchanges, symbols, time_horizon, start_date, end_date
+    return exchanges, symbols, time_horizon, start_date, end_date, derived_horizons
+
+def refresh_derived_tables(db, exchange, symbol, derived_horizons):
+    """Bring the higher-timeframe tables in line with the 1m table just written."""
+    for horizon in derived_horizons:
+        db.refresh_horizon_table(exchange, symbol, horizon)
 
 def main():
-    exchanges, symbols, time_horizon, start_date, end_date = load_config()
+    exchanges, symbols, time_horizon, start_date, end_date, derived_horizons = load_config()
 
     # Initialize DatabaseManager once to reuse connection
     db = DatabaseManager()
@@ -41,23 +47,32 @@ def main():
 
             if is_up_to_date:
                 print(f"Data for {symbol} on {exchange} is up-to-date (latest: {latest_timestamp})")
+                refresh_derived_tables(db, exchange, symbol, derived_horizons)
                 continue
 
-            # If table exists but isn't up-to-date, adjust start_date to fetch new data
+            # If table exists but isn't up-to-date, resume from its latest candle
+            # (the repeated boundary candle is upserted, not duplicated)
+            fetch_start = start_date
             if latest_timestamp:
-                start_date = latest_timestamp.strftime("%Y-%m-%d %H:%M:%S")
+                fetch_start = latest_timestamp.strftime("%Y-%m-%d %H:%M:%S")
 
             # Fetch Data
             fetcher = None
             if exchange == "binance":
-                fetcher = BinanceFetcher(symbol, time_horizon, start_date, end_date)
+                fetcher = BinanceBackfill(symbol, time_horizon, fetch_start, end_date)
             elif exchange == "bybit":
-                fetcher = BybitFetcher(symbol, "1", start_time=start_date, end_time=end_date)
+                fetcher = AsyncBybitFetcher(symbol, "1m", start_time=fetch_start, end_time=end_date)
             else:
                 print(f"Exchange '{exchange}' not supported.")
                 continue
 
-            df = fetcher.get_klines()
+            try:
+                df = fetcher.get_klines()
+            except ShardFetchError as e:
+                # Save only the part before the first failed window, so the stored data has no
+                # holes and the next run resumes from there instead of refetching the whole range
+                df = e.contiguous_prefix()
+                print(f"Fetch incomplete for {symbol} on {exchange}: {e}; saving the {len(df)} rows before it")
             if df.empty:
                 print(f"No data fetched for {symbol} on {exchange}.")
                 continue
@@ -66,10 +81,12 @@ def main():
 
             # Validate Data
             validator = DataValidator(df, "1m")
-            clean_df = validator.clean()
+            clean_df, gap_report = validator.repair_gaps()
 
             # Save to PostgreSQL DB
             db.save_dataframe(clean_df, exchange, symbol, "1m")
+            db.save_gap_report(gap_report, exchange, symbol, "1m")
+            refresh_derived_tables(db, exchange, symbol, derived_horizons)
 
     # Close database connection after all operations
     db.close()
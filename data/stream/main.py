@@ -0,0 +1,34 @@
+import asyncio
+import configparser
+from data.stream.kline_stream import KlineStreamService
+from data.utils.postgress_dataSave import DatabaseManager
+
+def load_config(config_path="E:\\Neurog\\New\\cryptoPipeline\\data\\config.ini"):
+    config = configparser.ConfigParser()
+    config.read(config_path)
+
+    exchanges = [e.strip().lower() for e in config["DEFAULT"]["exchange"].split(",")]
+    symbols = [s.strip().upper() for s in config["DEFAULT"]["symbols"].split(",")]
+    derived_horizons = [h.strip() for h in config["DEFAULT"].get("derived_horizons", "").split(",") if h.strip()]
+    stream = config["stream"] if config.has_section("stream") else config["DEFAULT"]
+    flush_seconds = float(stream.get("flush_seconds", "5"))
+    flush_rows = int(stream.get("flush_rows", "500"))
+
+    return exchanges, symbols, derived_horizons, flush_seconds, flush_rows
+
+async def run_streams():
+    exchanges, symbols, derived_horizons, flush_seconds, flush_rows = load_config()
+    # One DatabaseManager (one psycopg2 connection) per exchange stream
+    services = [
+        KlineStreamService(exchange, symbols, DatabaseManager(), flush_seconds=flush_seconds,
+                           flush_rows=flush_rows, derived_horizons=derived_horizons)
+        for exchange in exchanges
+    ]
+    try:
+        await asyncio.gather(*(service.run() for service in services))
+    finally:
+        for service in services:
+            service.db.close()
+
+if __name__ == "__main__":
+    asyncio.run(run_streams())
@@ -0,0 +1,137 @@
+#data/utils/incremental_resampler.py
+import numpy as np
+import pandas as pd
+from data.utils.interval_mapper import map_to_pandas_freq, resample_ohlcv
+
+BAR_COLUMNS = ["datetime", "open", "high", "low", "close", "volume"]
+
+
+class IncrementalResampler:
+    """
+    Append-only 1m -> `interval` aggregation.
+
+    Keeps the state of the current, unfinished bucket (open, running high/low, last
+    close, summed volume) and folds each new batch of 1m rows in with NumPy segment
+    reductions, so an update costs O(new rows). update() returns the bars that became
+    final: a bucket is final once its last minute or any later row has been seen.
+
+    Buckets are aligned to the Unix epoch, which matches resample_ohlcv for horizons
+    that tile a day (see divides_day). Rows at or before the last timestamp already
+    consumed are ignored, so overlapping batches are safe.
+    """
+
+    def __init__(self, interval, base_interval="1m"):
+        self.interval = interval
+        self.bucket_ns = pd.Timedelta(map_to_pandas_freq(interval)).value
+        self.base_ns = pd.Timedelta(map_to_pandas_freq(base_interval)).value
+        self.last_ts = None
+        self._bucket = None
+        self._open = self._high = self._low = self._close = self._volume = None
+
+    def _emit(self, starts, opens, highs, lows, closes, volumes):
+        bars = pd.DataFrame({
+            "datetime": pd.to_datetime(np.asarray(starts, dtype=np.int64)),
+            "open": opens, "high": highs, "low": lows, "close": closes, "volume": volumes,
+        }, columns=BAR_COLUMNS)
+        bars[BAR_COLUMNS[1:]] = bars[BAR_COLUMNS[1:]].astype(float).round(3)
+        return bars
+
+    def update(self, df):
+        """Fold a datetime-indexed 1m OHLCV frame in; return newly finalized bars."""
+        stamps = pd.DatetimeIndex(df.index).as_unit("ns").asi8
+        keep = ~np.isnan(df["close"].to_numpy(dtype=np.float64))
+        if self.last_ts is not None:
+            keep &= stamps > self.last_ts
+        if not keep.any():
+            return self._emit([], [], [], [], [], [])
+
+        stamps = stamps[keep]
+        opens = df["open"].to_numpy(dtype=np.float64)[keep]
+        highs = df["high"].to_numpy(dtype=np.float64)[keep]
+        lows = df["low"].to_numpy(dtype=np.float64)[keep]
+        closes = df["close"].to_numpy(dtype=np.float64)[keep]
+        volumes = df["volume"].to_numpy(dtype=np.float64)[keep]
+        self.last_ts = int(stamps[-1])
+
+        # Segment the (sorted) rows by bucket and reduce every segment at once
+        buckets = stamps - stamps % self.bucket_ns
+        seg_starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        seg_ends = np.r_[seg_starts[1:], len(buckets)]
+        bar_start = buckets[seg_starts]
+        bar_open = opens[seg_starts]
+        bar_high = np.fmax.reduceat(highs, seg_starts)
+        bar_low = np.fmin.reduceat(lows, seg_starts)
+        bar_close = closes[seg_ends - 1]
+        bar_volume = np.add.reduceat(volumes, seg_starts)
+
+        finished = []
+        # Merge the carried partial bucket into the first segment, or close it out
+        if self._bucket is not None:
+            if bar_start[0] == self._bucket:
+                bar_open[0] = self._open
+                bar_high[0] = np.fmax(bar_high[0], self._high)
+                bar_low[0] = np.fmin(bar_low[0], self._low)
+                bar_volume[0] += self._volume
+            else:
+                finished.append((self._bucket, self._open, self._high, self._low, self._close, self._volume))
+
+        # The last segment stays open unless its final minute has arrived
+        last_complete = self.last_ts + self.base_ns >= bar_start[-1] + self.bucket_ns
+        n_final = len(bar_start) if last_complete else len(bar_start) - 1
+        if last_complete:
+            self._bucket = None
+        else:
+            self._bucket = int(bar_start[-1])
+            self._open, self._high, self._low = bar_open[-1], bar_high[-1], bar_low[-1]
+            self._close, self._volume = bar_close[-1], bar_volume[-1]
+
+        starts = [bar[0] for bar in finished] + list(bar_start[:n_final])
+        columns = list(zip(*finished)) if finished else [[]] * 6
+        return self._emit(
+            starts,
+            list(columns[1]) + list(bar_open[:n_final]),
+            list(columns[2]) + list(bar_high[:n_final]),
+            list(columns[3]) + list(bar_low[:n_final]),
+            list(columns[4]) + list(bar_close[:n_final]),
+            list(columns[5]) + list(bar_volume[:n_final]),
+        )
+
+    def partial(self):
+        """The unfinished bucket as a one-row frame (empty if none), without finalizing it."""
+        if self._bucket is None:
+            return self._emit([], [], [], [], [], [])
+        return self._emit([self._bucket], [self._open], [self._high], [self._low], [self._close], [self._volume])
+
+    def flush(self):
+        """Finalize and return the unfinished bucket, e.g. when a refresh job ends."""
+        bars = self.partial()
+        self._bucket = None
+        return bars
+
+
+def check_parity(df_1m, interval, chunk_rows=997):
+    """Feed `df_1m` in chunks and return True when the bars equal resample_ohlcv on the whole frame."""
+    resampler = IncrementalResampler(interval)
+    parts = [resampler.update(df_1m.iloc[start:start + chunk_rows]) for start in range(0, len(df_1m), chunk_rows)]
+    parts.append(resampler.flush())
+    incremental = pd.concat(parts, ignore_index=True)
+    expected = resample_ohlcv(df_1m, interval).reset_index(drop=True)
+    incremental["datetime"] = incremental["datetime"].astype(expected["datetime"].dtype)
+    return incremental[BAR_COLUMNS].equals(expected[BAR_COLUMNS])
+
+
+if __name__ == "__main__":
+    # Parity against a full resample on a random walk with missing minutes
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2024-01-01", periods=50_000, freq="min", name="datetime")
+    index = index[rng.random(len(index)) > 0.05]
+    close = 100 + rng.standard_normal(len(index)).cumsum()
+    df_1m = pd.DataFrame({
+        "open": close + rng.standard_normal(len(index)),
+        "high": close + 2,
+        "low": close - 2,
+        "close": close,
+        "volume": rng.random(len(index)) * 10,
+    }, index=index)
+    for interval in ["5m", "15m", "1h", "4h", "1d"]:
+        print(f"{interval}: parity={check_parity(df_1m, interval)}")
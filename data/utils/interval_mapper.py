@@ -1,3 +1,4 @@
+import pandas as pd
 
 def map_to_pandas_freq(interval):
     # Handle minute-based intervals
@@ -14,3 +15,34 @@ def map_to_pandas_freq(interval):
 
     else:
         raise ValueError(f"Interval '{interval}' is not a valid pandas frequency.")
+
+
+def divides_day(interval):
+    """
+    True when candles of `interval` tile a day exactly (5m, 15m, 1h, 4h, 1d, ...).
+    Only those horizons have bucket boundaries that do not depend on where the 1m
+    history starts, so only they can be stored as derived tables and extended in place.
+    """
+    try:
+        length = pd.Timedelta(map_to_pandas_freq(interval))
+    except ValueError:
+        return False
+    return length > pd.Timedelta(0) and pd.Timedelta(days=1) % length == pd.Timedelta(0)
+
+
+def resample_ohlcv(df, custom_interval):
+    """Aggregate a datetime-indexed 1m OHLCV frame to `custom_interval` (datetime as a column)."""
+    pandas_freq = map_to_pandas_freq(custom_interval)
+    df_resampled = df.resample(pandas_freq).agg({
+        'open': 'first',
+        'high': 'max',
+        'low': 'min',
+        'close': 'last',
+        'volume': 'sum'
+    })
+
+    df_resampled = df_resampled.round(3)
+    df_resampled.reset_index(inplace=True)
+    df_resampled.dropna(inplace=True)
+
+    return df_resampled
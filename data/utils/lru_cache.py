@@ -0,0 +1,65 @@
+from collections import OrderedDict
+import threading
+
+
+class LRUCache:
+    """
+    Process-local LRU cache bounded by an approximate memory ceiling.
+
+    `sizeof` returns the size in bytes of a cached value; the least recently used
+    entries are evicted until the total fits under `max_bytes`.
+    """
+
+    def __init__(self, max_bytes, sizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._sizes.pop(key)
+                del self._entries[key]
+
+            # Values larger than the ceiling are not cached at all
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._total_bytes += size
+
+            while self._total_bytes > self.max_bytes:
+                old_key, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(old_key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
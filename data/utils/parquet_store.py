@@ -0,0 +1,149 @@
+#data/utils/parquet_store.py
+import os
+import glob
+import json
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+class ParquetStore:
+    """
+    Local columnar copy of the candle tables.
+
+    Layout: <root>/<exchange>/<symbol>/<interval>/<YYYY-MM>.parquet, one file per month
+    with a `datetime` column plus OHLCV. Reads open only the months a range touches,
+    memory-mapped, and return the same datetime-indexed frame as DataDownloader.download.
+    DataDownloader._sync_store appends new candles at the tail and, when a verification
+    is due, compares per-month summaries with Postgres to replace months whose history
+    was backfilled or repaired; the last verification is recorded in `_verified.json`.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _dir(self, exchange, symbol, interval):
+        return os.path.join(self.root, exchange.lower(), symbol.lower(), interval)
+
+    def _partitions(self, exchange, symbol, interval):
+        return sorted(glob.glob(os.path.join(self._dir(exchange, symbol, interval), "*.parquet")))
+
+    def _write_partition(self, path, part):
+        # Write then rename, so readers never see a half-written partition
+        tmp_path = f"{path}.tmp"
+        pq.write_table(pa.Table.from_pandas(part.reset_index(), preserve_index=False), tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _frame(df):
+        frame = df[OHLCV_COLUMNS].astype("float64")
+        frame.index = pd.DatetimeIndex(frame.index, name="datetime").as_unit("ns")
+        return frame
+
+    def verification(self, exchange, symbol, interval):
+        """The record saved by mark_verified, or None when the months were never verified."""
+        path = os.path.join(self._dir(exchange, symbol, interval), "_verified.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def mark_verified(self, exchange, symbol, interval, **record):
+        """Record a completed month verification (JSON-serialisable fields)."""
+        directory = self._dir(exchange, symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "_verified.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(record, f)
+        os.replace(f"{path}.tmp", path)
+
+    def month_summaries(self, exchange, symbol, interval, months):
+        """
+        {"YYYY-MM": (rows, first, last, close_sum)} for the stored months among `months`,
+        the same fingerprint DataDownloader._sync_store computes in Postgres.
+        """
+        summaries = {}
+        directory = self._dir(exchange, symbol, interval)
+        for month in months:
+            path = os.path.join(directory, f"{month}.parquet")
+            if not os.path.exists(path):
+                continue
+            table = pq.read_table(path, columns=["datetime", "close"], memory_map=True)
+            if table.num_rows == 0:
+                continue
+            bounds = pc.min_max(table.column("datetime")).as_py()
+            summaries[month] = (
+                table.num_rows, pd.Timestamp(bounds["min"]), pd.Timestamp(bounds["max"]),
+                pc.sum(table.column("close")).as_py()
+            )
+        return summaries
+
+    def replace_months(self, exchange, symbol, interval, months, df):
+        """
+        Overwrite each month in `months` with its rows from `df` (datetime-indexed OHLCV);
+        months without rows in `df` are deleted.
+        """
+        directory = self._dir(exchange, symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+        frame = self._frame(df).sort_index()
+        parts = dict(list(frame.groupby(frame.index.strftime("%Y-%m")))) if not frame.empty else {}
+        for month in months:
+            path = os.path.join(directory, f"{month}.parquet")
+            part = parts.get(month)
+            if part is not None:
+                self._write_partition(path, part[~part.index.duplicated(keep="last")])
+            elif os.path.exists(path):
+                os.remove(path)
+
+    def latest_timestamp(self, exchange, symbol, interval):
+        """Newest stored candle, or None when nothing is stored yet."""
+        partitions = self._partitions(exchange, symbol, interval)
+        if not partitions:
+            return None
+        column = pq.read_table(partitions[-1], columns=["datetime"], memory_map=True).column("datetime")
+        if len(column) == 0:
+            return None
+        return pd.Timestamp(pc.max(column).as_py())
+
+    def read(self, exchange, symbol, interval, start_date=None, end_date=None, columns=None):
+        if columns is None:
+            columns = OHLCV_COLUMNS
+        columns = ["datetime"] + [col for col in columns if col != "datetime"]
+        start = pd.to_datetime(start_date) if start_date else None
+        end = pd.to_datetime(end_date) if end_date else None
+        first_month = start.strftime("%Y-%m") if start is not None else None
+        last_month = end.strftime("%Y-%m") if end is not None else None
+
+        tables = []
+        for path in self._partitions(exchange, symbol, interval):
+            month = os.path.basename(path)[:-len(".parquet")]
+            if (first_month and month < first_month) or (last_month and month > last_month):
+                continue
+            tables.append(pq.read_table(path, columns=columns, memory_map=True))
+        if not tables:
+            return pd.DataFrame()
+
+        df = pa.concat_tables(tables).to_pandas().set_index("datetime")
+        # Partitions are sorted and disjoint, so the range is a positional slice
+        lo = df.index.searchsorted(start, side="left") if start is not None else 0
+        hi = df.index.searchsorted(end, side="right") if end is not None else len(df)
+        return df.iloc[lo:hi]
+
+    def write(self, exchange, symbol, interval, df):
+        """Merge a datetime-indexed OHLCV frame into its monthly partitions (newer rows win)."""
+        if df.empty:
+            return
+        directory = self._dir(exchange, symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+        frame = self._frame(df)
+
+        for month, part in frame.groupby(frame.index.strftime("%Y-%m")):
+            path = os.path.join(directory, f"{month}.parquet")
+            if os.path.exists(path):
+                existing = pq.read_table(path).to_pandas().set_index("datetime")
+                part = pd.concat([existing, part])
+                part = part[~part.index.duplicated(keep="last")]
+            self._write_partition(path, part.sort_index())
@@ -0,0 +1,56 @@
+#data/utils/pg_pool.py
+import os
+import threading
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+load_dotenv()
+
+# One pooled engine per process, shared by every PostgresConnection / DataDownloader
+_engine = None
+_engine_pid = None
+_lock = threading.Lock()
+
+
+def database_url():
+    db_name = os.getenv("PG_DATABASE")
+    user = os.getenv("PG_USER")
+    password = os.getenv("PG_PASSWORD")
+    host = os.getenv("PG_HOST")
+    port = os.getenv("PG_PORT")
+    if not all([db_name, user, password, host, port]):
+        raise ValueError("Missing PostgreSQL credentials in .env file")
+    return f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{db_name}"
+
+
+def get_engine():
+    """
+    The process-wide SQLAlchemy engine. Pool size, overflow and recycle time come from
+    PG_POOL_SIZE, PG_MAX_OVERFLOW and PG_POOL_RECYCLE; connections are pre-pinged so a
+    dropped server connection is replaced instead of failing the next query. A forked
+    worker process gets its own pool rather than reusing the parent's sockets.
+    """
+    global _engine, _engine_pid
+    with _lock:
+        if _engine is not None and _engine_pid != os.getpid():
+            _engine.dispose(close=False)
+            _engine = None
+        if _engine is None:
+            _engine = create_engine(
+                database_url(),
+                pool_size=int(os.getenv("PG_POOL_SIZE", "5")),
+                max_overflow=int(os.getenv("PG_MAX_OVERFLOW", "10")),
+                pool_recycle=int(os.getenv("PG_POOL_RECYCLE", "1800")),
+                pool_pre_ping=True
+            )
+            _engine_pid = os.getpid()
+        return _engine
+
+
+def dispose_engine():
+    """Close every pooled connection, e.g. at the end of a long-running job."""
+    global _engine
+    with _lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
@@ -1,46 +1,65 @@
-import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-import psycopg2
+#data/utils/postgress_connection.py
+from data.utils.pg_pool import get_engine
 
-load_dotenv()
+# Schemas / tables this process has already created or seen, so DDL runs once per process
+_known_objects = set()
 
 class PostgresConnection:
+    """
+    Handle on the shared connection pool. The engine is the process-wide pooled one
+    (see data.utils.pg_pool); the raw psycopg2 connection used for cursor work and COPY
+    is checked out of the same pool on first use and returned by close().
+    """
+
     def __init__(self):
-        # Load PostgreSQL credentials from .env
-        self.db_name = os.getenv("PG_DATABASE")
-        self.user = os.getenv("PG_USER")
-        self.password = os.getenv("PG_PASSWORD")
-        self.host = os.getenv("PG_HOST")
-        self.port = os.getenv("PG_PORT")
-        
-        if not all([self.db_name, self.user, self.password, self.host, self.port]):
-            raise ValueError("Missing PostgreSQL credentials in .env file")
-        
-        # Create SQLAlchemy engine
-        self.engine = create_engine(f"postgresql+psycopg2://{self.user}:{self.password}@{self.host}:{self.port}/{self.db_name}")
-        
-        # Create psycopg2 connection for schema operations
-        self.conn = psycopg2.connect(
-            dbname=self.db_name,
-            user=self.user,
-            password=self.password,
-            host=self.host,
-            port=self.port
-        )
-        self.conn.autocommit = True
-        self.cursor = self.conn.cursor()
+        self.engine = get_engine()
+        self.conn = None
+        self.cursor = None
 
     def get_engine(self):
         return self.engine
 
     def get_connection(self):
+        if self.conn is None:
+            self.conn = self.engine.raw_connection()
+            self.conn.driver_connection.autocommit = True
         return self.conn
 
     def get_cursor(self):
+        if self.cursor is None:
+            self.cursor = self.get_connection().cursor()
         return self.cursor
 
+    def ensure_schemas(self, *schemas):
+        """Create any of `schemas` not yet seen by this process, in a single round trip."""
+        missing = [schema for schema in schemas if schema not in _known_objects]
+        if missing:
+            self.get_cursor().execute("; ".join(f"CREATE SCHEMA IF NOT EXISTS {schema}" for schema in missing))
+            _known_objects.update(missing)
+
+    def ensure_table(self, qualified_table, ddl):
+        """
+        Run the (idempotent) DDL for `qualified_table` the first time this process needs
+        it. Returns True when the DDL was executed, False when the table was known already.
+        """
+        if qualified_table in _known_objects:
+            return False
+        self.get_cursor().execute(ddl)
+        _known_objects.add(qualified_table)
+        return True
+
+    def is_known(self, qualified_table):
+        return qualified_table in _known_objects
+
+    def mark_known(self, qualified_table):
+        _known_objects.add(qualified_table)
+
     def close(self):
-        self.cursor.close()
-        self.conn.close()
-        self.engine.dispose()
\ No newline at end of file
+        # Return the connection to the pool; the shared engine stays alive
+        if self.cursor is not None:
+            self.cursor.close()
+            self.cursor = None
+        if self.conn is not None:
+            self.conn.driver_connection.autocommit = False
+            self.conn.close()
+            self.conn = None
@@ -1,12 +1,17 @@
 #data/utils/postgress_dataSaver.py
+import io
 import pandas as pd
 from data.utils.postgress_connection import PostgresConnection 
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from data.utils.interval_mapper import divides_day, resample_ohlcv
 
 load_dotenv()
 
+# Rows streamed per COPY round trip when bulk-loading a frame
+COPY_CHUNK_ROWS = 200_000
+
 class DatabaseManager:
     def __init__(self):
         # Initialize PostgresConnection
@@ -20,32 +25,49 @@ class DatabaseManager:
         return f"{symbol.lower()}_{interval}"
 
     def _schema_exists(self, exchange):
+        # Cached per process: only the first call per schema reaches the server
+        self.pg_conn.ensure_schemas(f"{exchange.lower()}_data")
+
+    def _ensure_datetime_key(self, exchange, symbol, interval):
+        """
+        Give the table one row per candle: drop duplicate timestamps left by earlier
+        appends, then add the unique datetime index that upserts and range reads use.
+        """
         schema_name = f"{exchange.lower()}_data"
+        table_name = self._format_table_name(symbol, interval)
+        key_name = f"{table_name}_datetime_key"
+        self.cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_indexes WHERE schemaname = %s AND indexname = %s)",
+            (schema_name, key_name)
+        )
+        if self.cursor.fetchone()[0]:
+            return
+
+        print(f"Adding unique datetime key to {schema_name}.{table_name}")
+        self.cursor.execute(
+            f"""
+            DELETE FROM {schema_name}.{table_name} a
+            USING {schema_name}.{table_name} b
+            WHERE a.datetime = b.datetime AND a.ctid > b.ctid
+            """
+        )
+        if self.cursor.rowcount:
+            print(f"Removed {self.cursor.rowcount} duplicate rows from {schema_name}.{table_name}")
         self.cursor.execute(
-            "SELECT EXISTS (SELECT 1 FROM pg_namespace WHERE nspname = %s)",
-            (schema_name,)
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {key_name} ON {schema_name}.{table_name} (datetime)"
         )
-        schema_exists = self.cursor.fetchone()[0]
-        if not schema_exists:
-            print(f"Creating schema: {schema_name}")
-            self.cursor.execute(f"CREATE SCHEMA {schema_name}")
+        # The plain index is redundant once the unique key exists
+        self.cursor.execute(f"DROP INDEX IF EXISTS {schema_name}.{table_name}_datetime_idx")
     
     def table_exists(self, exchange, symbol, interval):
         schema_name = f"{exchange.lower()}_data"
         table_name = self._format_table_name(symbol, interval)
 
-        # Check if schema exists
-        self.cursor.execute(
-            "SELECT EXISTS (SELECT 1 FROM pg_namespace WHERE nspname = %s)",
-            (schema_name,)
-        )
-        schema_exists = self.cursor.fetchone()[0]
-
-        if not schema_exists:
-            print(f"Schema '{schema_name}' does not exist.")
-            return False
+        # Tables are never dropped by the pipeline, so a positive answer is cached
+        if self.pg_conn.is_known(f"{schema_name}.{table_name}"):
+            return True
 
-        # Check if table exists in the schema
+        # A missing schema simply yields no row here
         self.cursor.execute(
             """
             SELECT EXISTS (
@@ -60,6 +82,7 @@ class DatabaseManager:
 
         if table_exists:
             print(f"Data already exists in '{schema_name}.{table_name}'")
+            self.pg_conn.mark_known(f"{schema_name}.{table_name}")
         else:
             print(f"Table '{schema_name}.{table_name}' does not exist yet.")
 
@@ -98,28 +121,146 @@ class DatabaseManager:
         return is_up_to_date, latest_timestamp
 
 
-    def save_dataframe(self, df, exchange, symbol, interval):
+    def _column_definitions(self, df):
+        """Postgres column types for a frame: candles, signals, backtest results."""
+        definitions = []
+        for col in df.columns:
+            if col == "datetime" or pd.api.types.is_datetime64_any_dtype(df[col]):
+                definitions.append(f'"{col}" TIMESTAMP')
+            elif pd.api.types.is_bool_dtype(df[col]):
+                definitions.append(f'"{col}" BOOLEAN')
+            elif pd.api.types.is_integer_dtype(df[col]):
+                definitions.append(f'"{col}" BIGINT')
+            elif pd.api.types.is_numeric_dtype(df[col]):
+                definitions.append(f'"{col}" DOUBLE PRECISION')
+            else:
+                definitions.append(f'"{col}" TEXT')
+        return ", ".join(definitions)
+
+    def _copy_frame(self, df, qualified_table, chunk_rows=COPY_CHUNK_ROWS):
+        """Stream `df` into `qualified_table` with COPY FROM STDIN, `chunk_rows` rows at a time."""
+        columns = ", ".join(f'"{col}"' for col in df.columns)
+        copy_sql = f"COPY {qualified_table} ({columns}) FROM STDIN WITH (FORMAT csv)"
+        for start in range(0, len(df), chunk_rows):
+            buffer = io.StringIO()
+            df.iloc[start:start + chunk_rows].to_csv(
+                buffer, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S"
+            )
+            buffer.seek(0)
+            self.cursor.copy_expert(copy_sql, buffer)
+
+    def save_dataframe(self, df, exchange, symbol, interval, chunk_rows=COPY_CHUNK_ROWS):
+        """
+        Bulk-load candles: COPY the frame into a session temp staging table, then upsert
+        it into the target table on its unique datetime key. Re-running with overlapping
+        ranges (e.g. the boundary candle a resumed fetch repeats) updates rows in place.
+        """
+        schema_name = f"{exchange.lower()}_data"
         table_name = self._format_table_name(symbol, interval)
-        print(f"Saving data to table: {table_name} in schema: {exchange.lower()}_data")
+        staging_table = f"{table_name}_staging"
+        print(f"Saving data to table: {table_name} in schema: {schema_name}")
 
         self._schema_exists(exchange)
 
         df_to_save = df.copy()
         df_to_save.reset_index(inplace=True)
         df_to_save.rename(columns={"index": "datetime"}, inplace=True)
- 
-        df_to_save.to_sql(
-            table_name,
-            self.engine,
-            schema=f"{exchange.lower()}_data",
-            if_exists="append",
-            index=False
+
+        columns = ", ".join(df_to_save.columns)
+        updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in df_to_save.columns if col != "datetime")
+        # Table DDL and the key check run once per process per table
+        if self.pg_conn.ensure_table(
+            f"{schema_name}.{table_name}",
+            f"CREATE TABLE IF NOT EXISTS {schema_name}.{table_name} ({self._column_definitions(df_to_save)})"
+        ):
+            self._ensure_datetime_key(exchange, symbol, interval)
+
+        self.cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+        self.cursor.execute(f"CREATE TEMP TABLE {staging_table} (LIKE {schema_name}.{table_name} INCLUDING DEFAULTS)")
+        try:
+            self._copy_frame(df_to_save, staging_table, chunk_rows)
+            self.cursor.execute(
+                f"""
+                INSERT INTO {schema_name}.{table_name} ({columns})
+                SELECT DISTINCT ON (s.datetime) {", ".join(f"s.{col}" for col in df_to_save.columns)}
+                FROM {staging_table} s
+                ORDER BY s.datetime
+                ON CONFLICT (datetime) DO UPDATE SET {updates}
+                """
+            )
+            upserted = self.cursor.rowcount
+        finally:
+            self.cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+
+        print(f"Data ({df_to_save.shape}) merged into table '{table_name}' in schema: {schema_name} successfully ({upserted} rows upserted).")
+
+
+    def save_gap_report(self, report, exchange, symbol, interval):
+        """Record a DataValidator.repair_gaps report in <exchange>_data.gap_reports."""
+        schema_name = f"{exchange.lower()}_data"
+        self._schema_exists(exchange)
+        self.pg_conn.ensure_table(
+            f"{schema_name}.gap_reports",
+            f"""
+            CREATE TABLE IF NOT EXISTS {schema_name}.gap_reports (
+                table_name VARCHAR(50),
+                validated_at TIMESTAMP DEFAULT now(),
+                first_datetime TIMESTAMP,
+                last_datetime TIMESTAMP,
+                rows BIGINT,
+                gaps BIGINT,
+                synthesized_rows BIGINT,
+                longest_gap_rows BIGINT,
+                longest_gap_start TIMESTAMP
+            )
+            """
         )
-        
-        print(f"Data ({df_to_save.shape}) saved to table '{table_name}' in schema: {exchange.lower()}_data successfully.")
+        self.cursor.execute(
+            f"""
+            INSERT INTO {schema_name}.gap_reports (
+                table_name, first_datetime, last_datetime, rows, gaps,
+                synthesized_rows, longest_gap_rows, longest_gap_start
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            (
+                self._format_table_name(symbol, interval),
+                report["first_datetime"], report["last_datetime"], report["rows"], report["gaps"],
+                report["synthesized_rows"], report["longest_gap_rows"], report["longest_gap_start"],
+            )
+        )
+
+    def refresh_horizon_table(self, exchange, symbol, interval, base_interval="1m"):
+        """
+        Extend the derived `{symbol}_{interval}` table from the base 1m table. Only the
+        buckets from the table's last (possibly partial) one onward are recomputed and
+        upserted, so a run costs O(new 1m rows) once the table exists.
+        """
+        if not divides_day(interval):
+            print(f"Skipping derived table for {interval}: buckets do not tile a day")
+            return
+        schema_name = f"{exchange.lower()}_data"
+        base_table = self._format_table_name(symbol, base_interval)
+
+        latest_bucket = None
+        if self.table_exists(exchange, symbol, interval):
+            self.cursor.execute(f"SELECT MAX(datetime) FROM {schema_name}.{self._format_table_name(symbol, interval)}")
+            latest_bucket = self.cursor.fetchone()[0]
+
+        query = f"SELECT datetime, open, high, low, close, volume FROM {schema_name}.{base_table}"
+        params = None
+        if latest_bucket is not None:
+            query += " WHERE datetime >= %(start)s"
+            params = {"start": latest_bucket}
+        query += " ORDER BY datetime"
+        self.cursor.execute(query, params)
+        rows = self.cursor.fetchall()
+        if not rows:
+            return
 
+        df_base = pd.DataFrame(rows, columns=["datetime", "open", "high", "low", "close", "volume"]).set_index("datetime")
+        df_horizon = resample_ohlcv(df_base.astype(float), interval).set_index("datetime")
+        self.save_dataframe(df_horizon, exchange, symbol, interval)
 
     def close(self):
-        self.cursor.close()
-        self.conn.close()
-        self.engine.dispose()
\ No newline at end of file
+        # Hands the connection back to the shared pool; the engine stays up
+        self.pg_conn.close()
\ No newline at end of file
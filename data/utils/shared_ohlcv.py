@@ -0,0 +1,44 @@
+#data/utils/shared_ohlcv.py
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+def publish(df, directory):
+    """
+    Write a datetime-indexed OHLCV frame (as returned by DataDownloader.download) to
+    `directory` as one .npy file per column, for worker processes to attach() to.
+    """
+    os.makedirs(directory, exist_ok=True)
+    index = pd.DatetimeIndex(df.index).as_unit("ns")
+    np.save(os.path.join(directory, "datetime.npy"), index.asi8)
+    columns = [col for col in OHLCV_COLUMNS if col in df.columns]
+    for col in columns:
+        np.save(os.path.join(directory, f"{col}.npy"), np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)))
+    # Written last: attach() treats a directory without meta.json as incomplete
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump({"columns": columns, "rows": len(df)}, f)
+    return directory
+
+
+def attach(directory):
+    """
+    Read-only frame over the memory-mapped arrays in `directory`. The OS page cache
+    backs every process that attaches, so nothing is pickled or copied per worker.
+    Writing to the frame raises, as the arrays are mapped read-only.
+    """
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    stamps = np.load(os.path.join(directory, "datetime.npy"), mmap_mode="r")
+    index = pd.DatetimeIndex(stamps.view("datetime64[ns]"), name="datetime", copy=False)
+    data = {col: np.load(os.path.join(directory, f"{col}.npy"), mmap_mode="r") for col in meta["columns"]}
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+def release(directory):
+    """Delete a published directory once no process has it attached."""
+    shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,41 @@
+import hashlib
+import pandas as pd
+from data.utils.lru_cache import LRUCache
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+def columns_nbytes(columns):
+    return sum(values.nbytes for values in columns.values())
+
+
+class IndicatorCache:
+    """
+    Memoizes indicator output columns keyed by (data fingerprint, indicator name, params).
+
+    Optimization trials that revisit the same window on the same symbol/horizon
+    assemble their feature frame from cached arrays instead of recomputing TA-Lib.
+    Bounded by `max_mb` with LRU eviction.
+    """
+
+    def __init__(self, max_mb=512):
+        self.cache = LRUCache(max_bytes=int(max_mb * 1024 * 1024), sizeof=columns_nbytes)
+
+    @staticmethod
+    def fingerprint(df):
+        price_cols = [col for col in PRICE_COLUMNS if col in df.columns]
+        row_hashes = pd.util.hash_pandas_object(df[price_cols], index=False).to_numpy()
+        return hashlib.blake2b(row_hashes.tobytes(), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _key(fingerprint, name, params):
+        return (fingerprint, name, tuple(sorted((params or {}).items())))
+
+    def get(self, fingerprint, name, params):
+        return self.cache.get(self._key(fingerprint, name, params))
+
+    def put(self, fingerprint, name, params, columns):
+        self.cache.put(self._key(fingerprint, name, params), columns)
+
+    def clear(self):
+        self.cache.clear()
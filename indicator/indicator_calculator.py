@@ -1,15 +1,44 @@
 import pandas as pd
 import talib
+from indicator.indicator_cache import PRICE_COLUMNS
 
 class IndicatorCalculator:
-    def __init__(self, df):
+    def __init__(self, df, cache=None):
         self.df = df.copy()
+        self.cache = cache
 
     def apply_indicators(self, indicators=None, params=None):
         if indicators is None:
             return self.df
         if params is None:
             params = {}
+        if self.cache is not None:
+            self._apply_cached(indicators, params)
+        else:
+            self._compute(indicators, params)
+        return self.df.dropna(how='any')
+
+    def _apply_cached(self, indicators, params):
+        """Fill self.df indicator by indicator, computing only (indicator, params) pairs missing from the cache."""
+        fingerprint = self.cache.fingerprint(self.df)
+        base = self.df[[col for col in PRICE_COLUMNS if col in self.df.columns]]
+        for name, enabled in indicators.items():
+            if not enabled:
+                continue
+            ind_params = params.get(name, {})
+            columns = self.cache.get(fingerprint, name, ind_params)
+            if columns is None:
+                single = IndicatorCalculator(base)
+                single._compute({name: enabled}, {name: ind_params})
+                columns = {
+                    col: single.df[col].to_numpy()
+                    for col in single.df.columns if col not in base.columns
+                }
+                self.cache.put(fingerprint, name, ind_params, columns)
+            for col, values in columns.items():
+                self.df[col] = values
+
+    def _compute(self, indicators, params):
         close = self.df["close"]
         high = self.df["high"]
         low = self.df["low"]
@@ -199,6 +228,4 @@ class IndicatorCalculator:
         # Pattern Recognition
         for ind in indicators:
             if ind.startswith('cdl') and indicators.get(ind):
-                self.df[ind] = getattr(talib, ind.upper())(open_price, high, low, close)
-
-        return self.df.dropna(how='any')
\ No newline at end of file
+                self.df[ind] = getattr(talib, ind.upper())(open_price, high, low, close)
\ No newline at end of file
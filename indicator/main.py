@@ -21,15 +21,9 @@ def main():
     #Load config
     exchange, symbol, time_horizon = load_config()
 
-    #Download 1-minute data from DB
+    #Load candles at the configured horizon from DB
     downloader = DataDownloader()
-    df_1m = downloader.download(exchange, symbol, "1m")
-
-    #Resample if time horizon isn't "1m"
-    if time_horizon != "1m":
-        df_resampled = downloader.resample(df_1m, time_horizon)
-    else:
-        df_resampled = df_1m
+    df_resampled = downloader.download_horizon(exchange, symbol, time_horizon)
 
     # Apply TA indicators
     indicator_calc = IndicatorCalculator(df_resampled)
@@ -54,99 +54,110 @@ def run_pipeline():
             print(f"\n=== Training models for {symbol} - {time_horizon} ===")
 
             try:
-                df_1m = downloader.download(config['DATA']['exchange'], symbol, '1m', start_date, end_date)
-                df_resampled = df_1m if time_horizon == '1m' else downloader.resample(df_1m, time_horizon)
-
-                df_resampled['target'] = df_resampled['close'].shift(-1)
-                df_resampled = df_resampled.dropna().reset_index(drop=True)
-
-                X = df_resampled[['open', 'high', 'low', 'close', 'volume']]
-                y = df_resampled['target']
-
-                for model_name in models_to_train:
-                    if model_name not in model_classes:
-                        print(f"Model '{model_name}' not found")
-                        continue
-
-                    print(f"\nTraining {model_name}...")
-                    model_path = f"E:/Neurog/New/cryptoPipeline/ml/trainer/{symbol}/{time_horizon}/{model_name}"
-                    os.makedirs(model_path, exist_ok=True)
-
-                    learner = model_classes[model_name](symbol, time_horizon, model_name)
-                    best_trial_data = {"trial": None, "params": None, "pnl_sum": float('-inf'), "preds": None}
-
-                    def objective(trial):
-                        params = learner.get_search_space(trial)
-                        model = learner.train_model(X, y, params)
-                        learner.best_model = model
-                        preds = learner.predict(X)
-
-                        df_pred = df_resampled.copy()
-                        df_pred['predicted'] = preds
-                        df_pred['datetime'] = pd.to_datetime(df_pred['datetime'])
-                        df_pred = df_pred[['datetime', 'predicted']]
-
-                        df_merged = pd.merge_asof(
-                            df_1m.sort_values('datetime'),
-                            df_pred.sort_values('datetime'),
-                            on='datetime',
-                            direction='backward'
-                        ).dropna()
-
-                        result = run_backtest(df_merged, df_merged['predicted'].values, trial, model_name, save=False)
-                        pnl_sum = result['pnl_sum'].iloc[-1] if not result.empty else 0.0
-
-                        if pnl_sum > best_trial_data['pnl_sum']:
-                            best_trial_data.update({
-                                "trial": trial,
-                                "params": params,
-                                "pnl_sum": pnl_sum,
-                                "preds": df_merged['predicted'].values,
-                                "ohlcv_df": df_merged
-                            })
-
-                        db_folder = os.path.join(model_path, "db")
-                        os.makedirs(db_folder, exist_ok=True)
-                        db_path = os.path.join(db_folder, "results.db")
-
-                        with sqlite3.connect(db_path) as conn:
-                            cursor = conn.cursor()
-                            cursor.execute("""
-                                CREATE TABLE IF NOT EXISTS trial_results (
-                                    trial_number INTEGER,
-                                    params TEXT,
-                                    pnl_sum REAL
-                                )
-                            """)
-                            cursor.execute("""
-                                INSERT INTO trial_results (trial_number, params, pnl_sum)
-                                VALUES (?, ?, ?)
-                            """, (trial.number, json.dumps(params), pnl_sum))
-                            conn.commit()
-
-                        return pnl_sum
-
-                    study = optuna.create_study(direction='maximize')
-                    study.optimize(objective, n_trials=n_trials)
-
-                    if best_trial_data["trial"] is not None:
-                        final_result = run_backtest(
-                            best_trial_data["ohlcv_df"],
-                            best_trial_data["preds"],
-                            best_trial_data["trial"],
-                            model_name,
-                            save=True
-                        )
-                        os.makedirs("Signals_results", exist_ok=True)
-                        final_result.to_csv(
-                            os.path.join("Signals_results", f"backtest_{model_name}_best_trial_{best_trial_data['trial'].number}.csv"),
-                            index=False
-                        )
-
+                # The 1m frame is what predictions are backtested on; the horizon frame is what the models train on
+                df_1m = downloader.download(config['DATA']['exchange'], symbol, '1m', start_date, end_date).reset_index()
+                if time_horizon == '1m':
+                    df_resampled = df_1m.copy()
+                else:
+                    df_resampled = downloader.download_horizon(config['DATA']['exchange'], symbol, time_horizon, start_date, end_date)
+                train_models(df_1m, df_resampled, symbol, time_horizon, models_to_train, model_classes, n_trials)
             except Exception as e:
                 print(f"Error with {symbol} {time_horizon}: {e}")
 
 
+def train_models(df_1m, df_resampled, symbol, time_horizon, models_to_train, model_classes, n_trials,
+                 model_root="E:/Neurog/New/cryptoPipeline/ml/trainer"):
+    """
+    Tune each model on `df_resampled` (candles at `time_horizon`, datetime as a column) and
+    backtest its predictions on `df_1m` (1m candles, datetime as a column).
+    """
+    df_resampled['target'] = df_resampled['close'].shift(-1)
+    df_resampled = df_resampled.dropna().reset_index(drop=True)
+
+    X = df_resampled[['open', 'high', 'low', 'close', 'volume']]
+    y = df_resampled['target']
+
+    for model_name in models_to_train:
+        if model_name not in model_classes:
+            print(f"Model '{model_name}' not found")
+            continue
+
+        print(f"\nTraining {model_name}...")
+        model_path = os.path.join(model_root, symbol, time_horizon, model_name)
+        os.makedirs(model_path, exist_ok=True)
+
+        learner = model_classes[model_name](symbol, time_horizon, model_name)
+        best_trial_data = {"trial": None, "params": None, "pnl_sum": float('-inf'), "preds": None}
+
+        def objective(trial):
+            params = learner.get_search_space(trial)
+            model = learner.train_model(X, y, params)
+            learner.best_model = model
+            preds = learner.predict(X)
+
+            df_pred = df_resampled.copy()
+            df_pred['predicted'] = preds
+            df_pred['datetime'] = pd.to_datetime(df_pred['datetime'])
+            df_pred = df_pred[['datetime', 'predicted']]
+
+            df_merged = pd.merge_asof(
+                df_1m.sort_values('datetime'),
+                df_pred.sort_values('datetime'),
+                on='datetime',
+                direction='backward'
+            ).dropna()
+
+            result = run_backtest(df_merged, df_merged['predicted'].values, trial, model_name, save=False)
+            pnl_sum = result['pnl_sum'].iloc[-1] if not result.empty else 0.0
+
+            if pnl_sum > best_trial_data['pnl_sum']:
+                best_trial_data.update({
+                    "trial": trial,
+                    "params": params,
+                    "pnl_sum": pnl_sum,
+                    "preds": df_merged['predicted'].values,
+                    "ohlcv_df": df_merged
+                })
+
+            db_folder = os.path.join(model_path, "db")
+            os.makedirs(db_folder, exist_ok=True)
+            db_path = os.path.join(db_folder, "results.db")
+
+            with sqlite3.connect(db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS trial_results (
+                        trial_number INTEGER,
+                        params TEXT,
+                        pnl_sum REAL
+                    )
+                """)
+                cursor.execute("""
+                    INSERT INTO trial_results (trial_number, params, pnl_sum)
+                    VALUES (?, ?, ?)
+                """, (trial.number, json.dumps(params), pnl_sum))
+                conn.commit()
+
+            return pnl_sum
+
+        study = optuna.create_study(direction='maximize')
+        study.optimize(objective, n_trials=n_trials)
+
+        if best_trial_data["trial"] is not None:
+            final_result = run_backtest(
+                best_trial_data["ohlcv_df"],
+                best_trial_data["preds"],
+                best_trial_data["trial"],
+                model_name,
+                save=True
+            )
+            os.makedirs("Signals_results", exist_ok=True)
+            final_result.to_csv(
+                os.path.join("Signals_results", f"backtest_{model_name}_best_trial_{best_trial_data['trial'].number}.csv"),
+                index=False
+            )
+
+
 def run_backtest(ohlcv_df, predictions, trial, model_name, save=False):
     df = ohlcv_df.copy()
     df['predicted'] = predictions
@@ -164,10 +175,42 @@ def run_backtest(ohlcv_df, predictions, trial, model_name, save=False):
         signal_file = f"signals_{model_name}_best_trial_{trial.number}.csv"
         signal_df.to_csv(os.path.join("Signals_results", signal_file), index=False)
 
-    backtester = Backtester(ohlcv_df, signal_df)
+    backtester = Backtester(ohlcv_df, signal_df, engine='array')
     result = backtester.run()
     return result
 
 
+def smoke_test(n_trials=2):
+    """
+    Run train_models end to end on a synthetic 1m random walk, without the database or the
+    per-symbol error handling of run_pipeline, so a broken training path raises here.
+    """
+    import tempfile
+    from data.utils.interval_mapper import resample_ohlcv
+
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2024-01-01", periods=3 * 1440, freq="min", name="datetime")
+    close = 100 + np.cumsum(rng.normal(0, 0.1, len(index)))
+    df_1m = pd.DataFrame({
+        "open": close, "high": close + 0.05, "low": close - 0.05, "close": close, "volume": 1.0
+    }, index=index)
+    df_15m = resample_ohlcv(df_1m, "15m").reset_index()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root:
+        os.chdir(root)
+        try:
+            for time_horizon, df_resampled in (("1m", df_1m.reset_index()), ("15m", df_15m)):
+                train_models(df_1m.reset_index(), df_resampled, "SMOKE", time_horizon, ["linear_regression"],
+                             initialize_learners(), n_trials, model_root=root)
+                print(f"Smoke run {time_horizon}: ok")
+        finally:
+            os.chdir(cwd)
+
+
 if __name__ == "__main__":
-    run_pipeline()
+    import sys
+    if "--smoke" in sys.argv:
+        smoke_test()
+    else:
+        run_pipeline()
@@ -0,0 +1,77 @@
+#optimization/debug_artifacts.py
+import logging
+import os
+import queue
+import threading
+import importlib.util
+
+
+class DebugArtifactWriter:
+    """
+    Optional dump of intermediate trial frames (indicators, signals) for debugging.
+
+    Off by default. When enabled, every `sample_every`-th trial is queued and written
+    as Parquet by a background thread, so the optimization loop never waits on disk.
+    If the queue is full the frame is dropped rather than blocking the trial.
+    """
+
+    def __init__(self, enabled=False, output_dir="optimization_results/debug", sample_every=50, max_pending=8):
+        self.enabled = enabled
+        self.output_dir = output_dir
+        self.sample_every = max(1, int(sample_every))
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+
+        if self.enabled and importlib.util.find_spec("pyarrow") is None:
+            logging.warning("Debug artifacts need pyarrow for Parquet output; debug dumps disabled.")
+            self.enabled = False
+        if self.enabled:
+            os.makedirs(self.output_dir, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config):
+        """Build from the optional [debug] section of optuna_config.ini."""
+        if not config.has_section('debug'):
+            return cls()
+        section = config['debug']
+        return cls(
+            enabled=section.getboolean('enabled', fallback=False),
+            output_dir=section.get('output_dir', 'optimization_results/debug'),
+            sample_every=section.getint('sample_every', fallback=50),
+            max_pending=section.getint('max_pending', fallback=8),
+        )
+
+    def should_sample(self, trial_number):
+        return self.enabled and trial_number % self.sample_every == 0
+
+    def submit(self, strategy_name, trial_number, artifact, df):
+        """Queue `df` for writing as <output_dir>/<strategy>_trial<N>_<artifact>.parquet."""
+        if df is None or not self.should_sample(trial_number):
+            return
+        self._start()
+        path = os.path.join(self.output_dir, f"{strategy_name}_trial{trial_number}_{artifact}.parquet")
+        try:
+            # Copy so later in-place changes by the pipeline do not race with the writer
+            self._queue.put_nowait((path, df.copy()))
+        except queue.Full:
+            logging.warning(f"Debug artifact queue full, dropping {path}")
+
+    def flush(self):
+        """Block until every queued frame has been written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write_loop, name="debug-artifacts", daemon=True)
+            self._thread.start()
+
+    def _write_loop(self):
+        while True:
+            path, df = self._queue.get()
+            try:
+                df.to_parquet(path, index=False)
+            except Exception as e:
+                logging.warning(f"Failed to write debug artifact {path}: {e}")
+            finally:
+                self._queue.task_done()
@@ -3,11 +3,17 @@ import configparser
 import logging
 import json
 import datetime
+import uuid
 import optuna
 import pandas as pd
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from data.downloader.data_downloader import DataDownloader
+from data.downloader.ohlcv_cache import OHLCVCache
+from data.utils import shared_ohlcv
 from indicator.indicator_calculator import IndicatorCalculator
+from indicator.indicator_cache import IndicatorCache
+from optimization.debug_artifacts import DebugArtifactWriter
 from signals.technical_indicator_signal.signal_generator import SignalGenerator
 from strategies.strategy_pipeline.signal_processor import SignalProcessor
 from strategies.strategy_pipeline.generator import StrategyGenerator
@@ -20,6 +26,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 class Optimizer:
     def __init__(self, config_file):
+        self.config_file = config_file
         self.config = configparser.ConfigParser()
         self.config.read(config_file)
         self.exchange = self.config['DATA']['exchange']
@@ -30,6 +37,20 @@ class Optimizer:
         self.n_trials = int(self.config['optimization']['n_trials'])
         self.num_strategies = int(self.config['optimization']['num_strategies'])
         self.pnl_threshold = float(self.config['optimization']['pnl_threshold'])
+        # n_jobs > 1 runs the trials of each strategy in worker processes sharing a SQLite study
+        self.n_jobs = int(self.config['optimization'].get('n_jobs', '1'))
+        self.storage_url = self.config['optimization'].get('storage', 'sqlite:///optimization_results/optuna_studies.db')
+        # strategy_workers > 1 optimizes whole strategies concurrently; trials within a strategy then run serially
+        self.strategy_workers = int(self.config['optimization'].get('strategy_workers', '1'))
+        # When tp/sl grids are configured every trial sweeps all exit pairs in one batched
+        # backtest, and Optuna only searches the indicator windows
+        tp_grid = self.config['optimization'].get('tp_grid', '')
+        sl_grid = self.config['optimization'].get('sl_grid', '')
+        self.tp_sl_grid = [
+            (float(tp), float(sl))
+            for tp in tp_grid.split(',') if tp.strip()
+            for sl in sl_grid.split(',') if sl.strip()
+        ]
         self.strategy_generator = StrategyGenerator({
             'base_filename': self.config['general']['base_filename'],
             'prefix': self.config['general']['prefix'],
@@ -38,6 +59,20 @@ class Optimizer:
             'time_horizons': self.time_horizons
         })
         self.downloader = DataDownloader()
+        # Trials of a study share one in-memory OHLCV frame per (symbol, horizon)
+        self.data_cache = OHLCVCache(
+            self.downloader,
+            max_mb=float(self.config['optimization'].get('cache_max_mb', '1024'))
+        )
+        # Indicator columns are reused across trials that repeat an (indicator, window) pair
+        self.indicator_cache = IndicatorCache(
+            max_mb=float(self.config['optimization'].get('indicator_cache_max_mb', '512'))
+        )
+        # 1m frames published as memory-mapped arrays for worker processes (parallel modes only)
+        self.shared_ohlcv_dir = self.config['optimization'].get('shared_ohlcv_dir', 'optimization_results/shared_ohlcv')
+        self._published = {}
+        # Sampled indicator/signal frames written in the background; off unless [debug] enabled = true
+        self.debug_artifacts = DebugArtifactWriter.from_config(self.config)
         os.makedirs('optimization_results', exist_ok=True)
 
     def objective(self, trial, strategy):
@@ -99,27 +134,23 @@ class Optimizer:
             params['natr'] = {'window': trial.suggest_int('natr_window', 5, 30)}
         if isinstance(strategy.get('trange'), int):
             params['trange'] = {'window': trial.suggest_int('trange_window', 5, 30)}
-        tp = trial.suggest_float('tp', 0.01, 0.10)
-        sl = trial.suggest_float('sl', 0.01, 0.05)
+        if not self.tp_sl_grid:
+            tp = trial.suggest_float('tp', 0.01, 0.10)
+            sl = trial.suggest_float('sl', 0.01, 0.05)
 
         # Log trial parameters
         param_log = {k: v['window'] for k, v in params.items() if 'window' in v}
-        param_log.update({'tp': tp, 'sl': sl})
+        if not self.tp_sl_grid:
+            param_log.update({'tp': tp, 'sl': sl})
         logging.info(f"Trial {trial.number} for {strategy['name']}: {strategy['symbol']}, {strategy['time_horizon']}, params {param_log}")
 
-        # Download data
+        # Load data (served from the process-local cache after the first trial)
         symbol = strategy['symbol']
         time_horizon = strategy['time_horizon']
-        df_1m = self.downloader.download(self.exchange, symbol, "1m", self.start_date, self.end_date)
-        if df_1m is None or df_1m.empty:
-            logging.warning(f"No data for {symbol} at 1m")
-            return 0.0
-
-        # Resample data
-        df = df_1m if time_horizon == "1m" else self.downloader.resample(df_1m, time_horizon)
+        df = self.data_cache.get(self.exchange, symbol, time_horizon, self.start_date, self.end_date)
         if df is None or df.empty:
-            logging.warning(f"No resampled data for {symbol} at {time_horizon}")
-            return 0.0
+            logging.warning(f"No data for {symbol} at {time_horizon}")
+            return 0.0, None, None
 
         # Ensure datetime column
         if 'datetime' not in df.columns:
@@ -132,16 +163,15 @@ class Optimizer:
             k: v for k, v in strategy.items()
             if k not in ['name', 'exchange', 'symbol', 'time_horizon'] and (isinstance(v, bool) and v or isinstance(v, int))
         }
-        calculator = IndicatorCalculator(df)
+        calculator = IndicatorCalculator(df, cache=self.indicator_cache)
         df_with_indicators = calculator.apply_indicators(indicators=enabled_indicators, params=params)
         
-        df_with_indicators.to_csv("indicators.csv", index=False)
-        print("_______Indicators_______")
+        self.debug_artifacts.submit(strategy['name'], trial.number, "indicators", df_with_indicators)
 
 
         if df_with_indicators is None or df_with_indicators.empty:
             logging.warning(f"No indicators calculated for {symbol}")
-            return 0.0
+            return 0.0, None, None
 
         # Map indicators to signal names
         indicator_map = {
@@ -217,8 +247,7 @@ class Optimizer:
         if signal_df is None or signal_df.empty:
             logging.warning(f"No signals generated for {symbol}")
             return 0.0, None, None
-        signal_df.to_csv("signals.csv", index=False)
-        print("_______Signals_______")
+        self.debug_artifacts.submit(strategy['name'], trial.number, "signals", signal_df)
 
         # Process signals with voting
         processor = SignalProcessor()
@@ -227,9 +256,18 @@ class Optimizer:
             logging.warning(f"No final signals for {strategy['name']}")
             return 0.0, None, None
 
-        # Run backtest
-        backtester = Backtester(df_with_indicators, final_signal_df, tp=tp, sl=sl)
-        results = backtester.run()
+        # Sweep the exit grid in one batched backtest and keep the best pair and its ledger
+        if self.tp_sl_grid:
+            grid, results = Backtester(df_with_indicators, final_signal_df).run_grid(self.tp_sl_grid, return_best=True)
+            best = grid.loc[grid['pnl_sum'].idxmax()]
+            tp, sl = float(best['tp']), float(best['sl'])
+            trial.set_user_attr('tp', tp)
+            trial.set_user_attr('sl', sl)
+            logging.info(f"Trial {trial.number} best exit pair from grid: tp {tp}, sl {sl}")
+        else:
+            # Run backtest
+            backtester = Backtester(df_with_indicators, final_signal_df, tp=tp, sl=sl, engine='array')
+            results = backtester.run()
         if results.empty:
             logging.warning(f"No backtest results for {symbol}")
             return 0.0, None, None
@@ -240,92 +278,236 @@ class Optimizer:
         # Return pnl_sum and data for best trial
         return pnl_sum, final_signal_df, results
 
+    def _optimize_local(self, study, strategy, n_trials):
+        """Run n_trials of `study` in this process and keep the best trial's frames in memory."""
+        best_pnl = float('-inf')
+        best_signal_df = None
+        best_results = None
+        best_params = None
+        best_trial_number = None
+
+        def objective_wrapper(trial):
+            nonlocal best_pnl, best_signal_df, best_results, best_params, best_trial_number
+            pnl, signals, results = self.objective(trial, strategy)
+            if pnl > best_pnl:
+                best_pnl = pnl
+                best_signal_df = signals
+                best_results = results
+                best_params = {**trial.params, **trial.user_attrs}
+                best_trial_number = trial.number
+            return pnl
+
+        study.optimize(objective_wrapper, n_trials=n_trials)
+        return best_pnl, best_signal_df, best_results, best_params, best_trial_number
+
+    def _optimize_parallel(self, pool, strategy):
+        """
+        Spread the trials of one strategy over the worker pool. Workers share the study
+        through the SQLite storage and send back their best trial's frames.
+        """
+        # A fresh study per run: strategy names repeat across runs, and a study left in the
+        # storage by an earlier or crashed run must not feed its trials into this one
+        study_name = f"{strategy['name']}_{datetime.datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}"
+        optuna.create_study(study_name=study_name, storage=self._storage(), direction='maximize')
+        per_worker, remainder = divmod(self.n_trials, self.n_jobs)
+        shares = [per_worker + (1 if w < remainder else 0) for w in range(self.n_jobs)]
+        shared_path = self._share_ohlcv(strategy['symbol'])
+        futures = [
+            pool.submit(_run_trials_in_worker, self.config_file, strategy, study_name, share, shared_path)
+            for share in shares if share > 0
+        ]
+        outcomes = [future.result() for future in futures]
+        return max(outcomes, key=lambda outcome: outcome[0])
+
+    def _share_ohlcv(self, symbol):
+        """
+        Load the 1m history of `symbol` once in the parent and publish it as memory-mapped
+        arrays, so every worker attaches to the same pages instead of loading its own copy.
+        """
+        if symbol in self._published:
+            return self._published[symbol]
+        df = self.downloader.download(self.exchange, symbol, "1m", self.start_date, self.end_date)
+        path = None
+        if df is not None and not df.empty:
+            path = shared_ohlcv.publish(df, os.path.join(self.shared_ohlcv_dir, f"{self.exchange.lower()}_{symbol.strip().lower()}_1m"))
+        self._published[symbol] = path
+        return path
+
+    def _attach_ohlcv(self, symbol, shared_path):
+        """Seed this worker's data cache with the parent's published 1m frame."""
+        if shared_path is None:
+            return
+        if self.data_cache.contains(self.exchange, symbol, "1m", self.start_date, self.end_date):
+            return
+        self.data_cache.put(self.exchange, symbol, "1m", self.start_date, self.end_date, shared_ohlcv.attach(shared_path))
+
+    def _release_shared(self):
+        for path in self._published.values():
+            if path is not None:
+                shared_ohlcv.release(path)
+        self._published.clear()
+
+    def _storage(self):
+        return optuna.storages.RDBStorage(
+            url=self.storage_url,
+            engine_kwargs={"connect_args": {"timeout": 60}}
+        )
+
     def run(self):
+        if self.strategy_workers > 1:
+            return self.run_concurrent()
         db = DatabaseManager()
         max_index = db.fetch_strategies()
-        for i in range(self.num_strategies):
-            new_index = max_index + i + 1
-            strategy = self.strategy_generator.generate_strategy(new_index)
-            logging.info(f"Optimizing strategy {strategy['name']}: {strategy['symbol']}, {strategy['time_horizon']}, indicators {strategy}")
-            study = optuna.create_study(direction='maximize')
-            best_pnl = float('-inf')
-            best_signal_df = None
-            best_results = None
-            best_params = None
-            best_trial_number = None
-
-            def objective_wrapper(trial):
-                nonlocal best_pnl, best_signal_df, best_results, best_params, best_trial_number
-                pnl, signals, results = self.objective(trial, strategy)
-                if pnl > best_pnl:
-                    best_pnl = pnl
-                    best_signal_df = signals
-                    best_results = results
-                    best_params = trial.params
-                    best_trial_number = trial.number
-                return pnl
-
-            study.optimize(objective_wrapper, n_trials=self.n_trials)
-            logging.info(f"Best trial for {strategy['name']}: trial {best_trial_number}, pnl_sum {best_pnl}, params {best_params}")
-
-            # Save best trial data
-            if best_signal_df is not None and best_results is not None:
-                if best_signal_df is not None and not best_signal_df.empty:
-                    db.save_signals(best_signal_df, strategy['name'])
-                    print(f"Saved final signals for {strategy['name']}")
-
-                # Display final balance and summary
-                if not best_results.empty:
-                    best_results[['buy_price', 'sell_price', 'pnl_percent', 'pnl_sum', 'balance']] = best_results[[
-                        'buy_price', 'sell_price', 'pnl_percent', 'pnl_sum', 'balance'
-                    ]].round(2)
-                    print(f"\n Final Balance: {best_results.iloc[-1]['balance']:.2f}")
-                    print(f"Total Trades: {len(best_results[best_results['action'].isin(['tp', 'sl'])])}")
-                    print(best_results.tail(10))
-                    db.save_backtest_results(best_results, strategy['name'])
+        pool = None
+        if self.n_jobs > 1:
+            pool = ProcessPoolExecutor(max_workers=self.n_jobs)
+        try:
+            for i in range(self.num_strategies):
+                new_index = max_index + i + 1
+                strategy = self.strategy_generator.generate_strategy(new_index)
+                logging.info(f"Optimizing strategy {strategy['name']}: {strategy['symbol']}, {strategy['time_horizon']}, indicators {strategy}")
+                if pool is not None:
+                    best = self._optimize_parallel(pool, strategy)
                 else:
-                    print("No trades were executed.")
-
-                # Append strategy to strategies_config table with indicator windows
-                strategy_config = {
-                    'name': strategy['name'],
-                    'exchange': strategy['exchange'],
-                    'symbol': strategy['symbol'],
-                    'time_horizon': strategy['time_horizon'],
-                    'tp': round(best_params.get('tp', 0.0), 2), 
-                    'sl': round(best_params.get('sl', 0.0), 2),
-                }
-                # Add indicator enable/disable flags
-                strategy_config.update({ind: strategy.get(ind, False) for ind in INDICATORS})
-                # Add indicator window sizes
-                window_indicators = [
-                    'sma', 'ema', 'wma', 'dema', 'tema', 'trima', 'kama', 't3', 'midpoint', 'bbands',
-                    'adx', 'adxr', 'aroon', 'aroonosc', 'cci', 'cmo', 'dx', 'mfi', 'minus_di', 'minus_dm',
-                    'plus_di', 'plus_dm', 'rsi', 'trix', 'willr', 'atr', 'natr', 'trange'
-                ]
-                for ind in window_indicators:
-                    window_key = f"{ind}_window"
-                    if strategy.get(ind, False) and best_params and window_key in best_params:
-                        strategy_config[window_key] = best_params[window_key]
-                    else:
-                        strategy_config[window_key] = 0
-
-                db.save_strategies([strategy_config])
-                print(f"Appended strategy {strategy['name']} to strategies_config table")
-
-                metadata_file = f"optimization_results/{strategy['name']}_metadata.json"
-                metadata = {
-                    'strategy_name': strategy['name'],
-                    'trial_number': best_trial_number,
-                    'symbol': strategy['symbol'],
-                    'time_horizon': strategy['time_horizon'],
-                    'pnl_sum': best_pnl,
-                    'optimized_params': best_params
+                    study = optuna.create_study(direction='maximize')
+                    best = self._optimize_local(study, strategy, self.n_trials)
+                self.save_best(db, strategy, *best)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+                self._release_shared()
+            self.debug_artifacts.flush()
+
+    def run_concurrent(self):
+        """
+        Generate all strategies up front and optimize them in `strategy_workers` processes.
+        Strategies sharing a (symbol, time_horizon) go to the same worker so the OHLCV frame
+        is loaded once, and each worker saves a strategy as soon as its study finishes.
+        """
+        db = DatabaseManager()
+        max_index = db.fetch_strategies()
+        # Created once here so workers do not race on CREATE TABLE
+        db.create_strategies_table()
+
+        groups = {}
+        for i in range(self.num_strategies):
+            strategy = self.strategy_generator.generate_strategy(max_index + i + 1)
+            groups.setdefault((strategy['symbol'], strategy['time_horizon']), []).append(strategy)
+        logging.info(f"Optimizing {self.num_strategies} strategies in {len(groups)} (symbol, time_horizon) groups with {self.strategy_workers} workers")
+
+        try:
+            with ProcessPoolExecutor(max_workers=self.strategy_workers) as pool:
+                futures = {
+                    pool.submit(_optimize_group_in_worker, self.config_file, strategies, self._share_ohlcv(key[0])): key
+                    for key, strategies in groups.items()
                 }
-                with open(metadata_file, 'w') as f:
-                    json.dump(metadata, f, indent=4)
+                for future in as_completed(futures):
+                    symbol, time_horizon = futures[future]
+                    try:
+                        for name, pnl in future.result():
+                            logging.info(f"Finished {name} ({symbol}, {time_horizon}): pnl_sum {pnl}")
+                    except Exception as e:
+                        logging.error(f"Strategy group ({symbol}, {time_horizon}) failed: {e}")
+        finally:
+            self._release_shared()
+
+    def save_best(self, db, strategy, best_pnl, best_signal_df, best_results, best_params, best_trial_number):
+        logging.info(f"Best trial for {strategy['name']}: trial {best_trial_number}, pnl_sum {best_pnl}, params {best_params}")
+
+        # Save best trial data
+        if best_signal_df is not None and best_results is not None:
+            if best_signal_df is not None and not best_signal_df.empty:
+                db.save_signals(best_signal_df, strategy['name'])
+                print(f"Saved final signals for {strategy['name']}")
+
+            # Display final balance and summary
+            if not best_results.empty:
+                best_results[['buy_price', 'sell_price', 'pnl_percent', 'pnl_sum', 'balance']] = best_results[[
+                    'buy_price', 'sell_price', 'pnl_percent', 'pnl_sum', 'balance'
+                ]].round(2)
+                print(f"\n Final Balance: {best_results.iloc[-1]['balance']:.2f}")
+                print(f"Total Trades: {len(best_results[best_results['action'].isin(['tp', 'sl'])])}")
+                print(best_results.tail(10))
+                db.save_backtest_results(best_results, strategy['name'])
+            else:
+                print("No trades were executed.")
+
+            # Append strategy to strategies_config table with indicator windows
+            strategy_config = {
+                'name': strategy['name'],
+                'exchange': strategy['exchange'],
+                'symbol': strategy['symbol'],
+                'time_horizon': strategy['time_horizon'],
+                # Exact values, so the saved strategy reproduces the pnl it was selected on
+                'tp': float(best_params.get('tp', 0.0)),
+                'sl': float(best_params.get('sl', 0.0)),
+            }
+            # Add indicator enable/disable flags
+            strategy_config.update({ind: strategy.get(ind, False) for ind in INDICATORS})
+            # Add indicator window sizes
+            window_indicators = [
+                'sma', 'ema', 'wma', 'dema', 'tema', 'trima', 'kama', 't3', 'midpoint', 'bbands',
+                'adx', 'adxr', 'aroon', 'aroonosc', 'cci', 'cmo', 'dx', 'mfi', 'minus_di', 'minus_dm',
+                'plus_di', 'plus_dm', 'rsi', 'trix', 'willr', 'atr', 'natr', 'trange'
+            ]
+            for ind in window_indicators:
+                window_key = f"{ind}_window"
+                if strategy.get(ind, False) and best_params and window_key in best_params:
+                    strategy_config[window_key] = best_params[window_key]
+                else:
+                    strategy_config[window_key] = 0
+
+            db.save_strategies([strategy_config])
+            print(f"Appended strategy {strategy['name']} to strategies_config table")
+
+            metadata_file = f"optimization_results/{strategy['name']}_metadata.json"
+            metadata = {
+                'strategy_name': strategy['name'],
+                'trial_number': best_trial_number,
+                'symbol': strategy['symbol'],
+                'time_horizon': strategy['time_horizon'],
+                'pnl_sum': best_pnl,
+                'optimized_params': best_params
+            }
+            with open(metadata_file, 'w') as f:
+                json.dump(metadata, f, indent=4)
+
+
+# One Optimizer per worker process, so its data and indicator caches survive across tasks
+_worker_optimizer = None
+
+def _run_trials_in_worker(config_file, strategy, study_name, n_trials, shared_path=None):
+    """Process-pool entry point: run a share of the trials of a study stored in SQLite."""
+    global _worker_optimizer
+    if _worker_optimizer is None:
+        _worker_optimizer = Optimizer(config_file)
+    _worker_optimizer._attach_ohlcv(strategy['symbol'], shared_path)
+    study = optuna.load_study(study_name=study_name, storage=_worker_optimizer._storage())
+    try:
+        return _worker_optimizer._optimize_local(study, strategy, n_trials)
+    finally:
+        _worker_optimizer.debug_artifacts.flush()
+
+def _optimize_group_in_worker(config_file, strategies, shared_path=None):
+    """Process-pool entry point: optimize and save strategies that share a symbol and horizon."""
+    global _worker_optimizer
+    if _worker_optimizer is None:
+        _worker_optimizer = Optimizer(config_file)
+    _worker_optimizer._attach_ohlcv(strategies[0]['symbol'], shared_path)
+    db = DatabaseManager()
+    finished = []
+    try:
+        for strategy in strategies:
+            logging.info(f"Optimizing strategy {strategy['name']}: {strategy['symbol']}, {strategy['time_horizon']}")
+            study = optuna.create_study(direction='maximize')
+            best = _worker_optimizer._optimize_local(study, strategy, _worker_optimizer.n_trials)
+            _worker_optimizer.save_best(db, strategy, *best)
+            finished.append((strategy['name'], best[0]))
+    finally:
+        db.close()
+        _worker_optimizer.debug_artifacts.flush()
+    return finished
 
-            
 
 if __name__ == "__main__":
     logging.info(f"Running optimizer.py at {datetime.datetime.now()}")
@@ -23,10 +23,9 @@ def main():
 
     # Load from SQLite
     downloader = DataDownloader()
-    df_1m = downloader.download(exchange, symbol, base_interval="1m")
-
-    # Resample to desired interval
-    df = downloader.resample(df_1m, custom_interval=time_horizon)
+    df = downloader.download_horizon(exchange, symbol, time_horizon)
+    if 'datetime' not in df.columns:
+        df = df.reset_index()
 
     # Dictionary for enabled indicators from all sections
     enabled_indicators = {}
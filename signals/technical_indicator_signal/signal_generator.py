@@ -1,5 +1,6 @@
 import pandas as pd
-from signals.technical_indicator_signal.signal_rules import get_signal_rules
+import numpy as np
+from signals.technical_indicator_signal.signal_rules import get_signal_rules, get_vectorized_signal_rules, close_vs_column, pattern_vectorized
 
 # Generic rules for indicators without custom logic
 
@@ -21,11 +22,45 @@ def pattern_rule(val):
     return 0
 
 class SignalGenerator:
-    def __init__(self, df, indicator_names=None):
+    def __init__(self, df, indicator_names=None, vectorized=True):
         self.df = df.copy()
         self.indicator_names = indicator_names
+        self.vectorized = vectorized
 
     def generate_signals(self):
+        if self.vectorized:
+            return self._generate_vectorized()
+        return self._generate_row_wise()
+
+    def _generate_vectorized(self):
+        """Column-wise rule engine: one NumPy pass per indicator, int8 signal columns."""
+        df = self.df
+        signal_rules = get_vectorized_signal_rules()
+        signal_columns = []
+
+        for indicator in self.indicator_names:
+            rule_func = signal_rules.get(indicator)
+            signal_col = f"signal_{indicator}"
+            try:
+                if rule_func is not None:
+                    if getattr(rule_func, "requires_row", False):
+                        df[signal_col] = rule_func(df)
+                    else:
+                        df[signal_col] = rule_func(df[indicator].to_numpy())
+                elif indicator.startswith('CDL'):
+                    df[signal_col] = pattern_vectorized(df[indicator].to_numpy())
+                else:
+                    # Use generic rule for overlap/price transform
+                    df[signal_col] = close_vs_column(indicator)(df)
+            except Exception as e:
+                print(f"[Warning] Error applying rule for '{indicator}': {e}")
+                df[signal_col] = np.int8(0)
+            signal_columns.append(signal_col)
+
+        base_columns = ['datetime', 'open', 'high', 'low', 'close', 'volume']
+        return df[base_columns + signal_columns]
+
+    def _generate_row_wise(self):
         df = self.df
         signal_rules = get_signal_rules()
         signal_columns = []
@@ -51,3 +86,44 @@ class SignalGenerator:
 
         base_columns = ['datetime', 'open', 'high', 'low', 'close', 'volume']
         return df[base_columns + signal_columns]
+
+
+def check_parity(df, indicator_names):
+    """Return the signal columns where the vectorized engine differs from the row-wise rules."""
+    vectorized = SignalGenerator(df, indicator_names, vectorized=True).generate_signals()
+    row_wise = SignalGenerator(df, indicator_names, vectorized=False).generate_signals()
+    signal_cols = [col for col in row_wise.columns if col.startswith('signal_')]
+    return [
+        col for col in signal_cols
+        if not np.array_equal(vectorized[col].to_numpy(dtype=np.int64), row_wise[col].to_numpy(dtype=np.int64))
+    ]
+
+
+if __name__ == "__main__":
+    # Parity check of every rule on synthetic data (NaN warm-up rows included)
+    rng = np.random.default_rng(0)
+    n = 2000
+    close = 100 + rng.standard_normal(n).cumsum()
+    df = pd.DataFrame({
+        'datetime': pd.date_range("2024-01-01", periods=n, freq="min"),
+        'open': close + rng.standard_normal(n),
+        'high': close + 2,
+        'low': close - 2,
+        'close': close,
+        'volume': rng.random(n) * 10,
+    })
+    rule_names = list(get_signal_rules())
+    columns = set(rule_names) | {'sma_20', 'ema_20', 'ma_20', 'wma_20', 'dema_20', 'tema_20', 'kama_30',
+                                 'trima_30', 't3_5', 'bb_upper', 'bb_lower', 'donchian_upper',
+                                 'donchian_lower', 'CDLDOJI', 'sma_12'}
+    # Mix exact threshold values, ties with close and random values
+    edges = np.array([-100, -80, -50, -20, 0, 1, 2, 10, 20, 25, 30, 50, 70, 80, 90, 100, 180])
+    for col in sorted(columns):
+        values = np.where(rng.random(n) < 0.5, rng.choice(edges, n), rng.uniform(-250, 250, n))
+        values[::7] = close[::7]
+        values[:30] = np.nan
+        df[col] = values
+
+    indicator_names = rule_names + ['sma_12', 'bb_upper', 'CDLDOJI', 'missing_column']
+    mismatches = check_parity(df, indicator_names)
+    print(f"Checked {len(indicator_names)} indicators, mismatches: {mismatches}")
@@ -29,12 +29,8 @@ if __name__ == "__main__":
 
     # Fetch OHLCV data with date filtering
     downloader = DataDownloader()
-    df_1m = downloader.download(exchange, symbol, "1m", start_date_str, end_date_str)
-    print(df_1m.shape)
-    if time_horizon != "1m":
-        df = downloader.resample(df_1m, time_horizon)
-    else:
-        df= df_1m
+    df = downloader.download_horizon(exchange, symbol, time_horizon, start_date_str, end_date_str)
+    print(df.shape)
 
     if df is not None and not df.empty:
         # Ensure 'datetime' is a column, not just index
@@ -616,4 +616,130 @@ def get_signal_rules():
         'cdlunique3river': pattern_rule,
         'cdlupsidegap2crows': pattern_rule,
         'cdlxsidgap3methods': pattern_rule,
-    }
\ No newline at end of file
+    }
+
+# === Vectorized Rules ===
+# Column-wise NumPy forms of the rules above. Each one returns an int8 array of
+# -1/0/1 and gives the same result as applying the scalar/row rule bar by bar:
+# the first condition wins, and NaN comparisons are False so they map to 0.
+
+def _select(first_mask, first_value, second_mask, second_value):
+    signal = np.zeros(len(first_mask), dtype=np.int8)
+    signal[second_mask] = second_value
+    signal[first_mask] = first_value
+    return signal
+
+def close_vs_column(column):
+    def rule(df):
+        close = df['close'].to_numpy()
+        value = df[column].to_numpy()
+        return _select(close > value, 1, close < value, -1)
+    rule.requires_row = True
+    return rule
+
+def threshold(upper, lower, above_signal=1):
+    def rule(values):
+        return _select(values > upper, above_signal, values < lower, -above_signal)
+    return rule
+
+def equals(first, second):
+    def rule(values):
+        return _select(values == first, 1, values == second, -1)
+    return rule
+
+def bbands_vectorized(df):
+    close = df['close'].to_numpy()
+    return _select(close > df['bb_upper'].to_numpy(), -1, close < df['bb_lower'].to_numpy(), 1)
+bbands_vectorized.requires_row = True
+
+def donchian_vectorized(df):
+    close = df['close'].to_numpy()
+    return _select(close > df['donchian_upper'].to_numpy(), 1, close < df['donchian_lower'].to_numpy(), -1)
+donchian_vectorized.requires_row = True
+
+pattern_vectorized = equals(100, -100)
+
+def get_vectorized_signal_rules():
+    """Vectorized counterparts of get_signal_rules(), keyed by the same indicator names."""
+    rules = {
+        # === Overlap Studies ===
+        'sma': close_vs_column('sma_20'),
+        'ema': close_vs_column('ema_20'),
+        'ma': close_vs_column('ma_20'),
+        'wma': close_vs_column('wma_20'),
+        'dema': close_vs_column('dema_20'),
+        'tema': close_vs_column('tema_20'),
+        'kama': close_vs_column('kama_30'),
+        'trima': close_vs_column('trima_30'),
+        't3': close_vs_column('t3_5'),
+        'ht_trendline': close_vs_column('ht_trendline'),
+        'mama': close_vs_column('mama'),
+        'midpoint': close_vs_column('midpoint'),
+        'midprice': close_vs_column('midprice'),
+        'parabolic_sar': close_vs_column('parabolic_sar'),
+        'sarext': close_vs_column('sarext'),
+        'bbands': bbands_vectorized,
+        'donchian': donchian_vectorized,
+
+        # === Momentum Indicators ===
+        'macd': threshold(0, 0),
+        'macdext': threshold(0, 0),
+        'macdfix': threshold(0, 0),
+        'rsi': threshold(70, 30, above_signal=-1),
+        'adx': threshold(25, 20),
+        'adxr': threshold(25, 20),
+        'apo': threshold(0, 0),
+        'aroon_up': threshold(50, 30),
+        'aroon_osc': threshold(0, 0),
+        'bop': threshold(0, 0),
+        'cci': threshold(100, -100),
+        'cmo': threshold(50, -50),
+        'dx': threshold(25, 20),
+        'mfi': threshold(80, 20, above_signal=-1),
+        'minus_di': threshold(20, 10, above_signal=-1),
+        'minus_dm': threshold(0, 0, above_signal=-1),
+        'mom': threshold(0, 0),
+        'plus_di': threshold(20, 10),
+        'plus_dm': threshold(0, 0),
+        'ppo': threshold(0, 0),
+        'roc': threshold(0, 0),
+        'rocp': threshold(0, 0),
+        'rocr': threshold(1, 1),
+        'rocr100': threshold(100, 100),
+        'stoch_k': threshold(80, 20, above_signal=-1),
+        'stochf_k': threshold(80, 20, above_signal=-1),
+        'stochrsi_k': threshold(80, 20, above_signal=-1),
+        'trix': threshold(0, 0),
+        'ultosc': threshold(70, 30),
+        'williams_r': threshold(-20, -80, above_signal=-1),
+
+        # === Volume Indicators ===
+        'ad': threshold(0, 0),
+        'adosc': threshold(0, 0),
+        'obv': threshold(0, 0),
+
+        # === Volatility Indicators ===
+        'atr': threshold(2, 1),
+        'natr': threshold(2, 1),
+        'trange': threshold(2, 1),
+        'chaikin_volatility': threshold(10, -10),
+
+        # === Price Transform ===
+        'avgprice': close_vs_column('avgprice'),
+        'medprice': close_vs_column('medprice'),
+        'typprice': close_vs_column('typprice'),
+        'wclprice': close_vs_column('wclprice'),
+
+        # === Cycle Indicators ===
+        'ht_dcperiod': threshold(20, 10),
+        'ht_dcphase': threshold(180, 90),
+        'ht_inphase': threshold(0, 0),
+        'ht_sine': threshold(0, 0),
+        'ht_trendmode': equals(1, 0),
+    }
+
+    # === Pattern Recognition ===
+    for name, rule in get_signal_rules().items():
+        if rule is pattern_rule:
+            rules[name] = pattern_vectorized
+    return rules
@@ -1,6 +1,5 @@
-from strategies.strategy_pipeline.utils.postgress_connection import PostgresConnection
+from strategies.strategy_pipeline.utils.postgress_handler import DatabaseManager
 from stats.generate_stats import generate_stats_from_backtest
-import pandas as pd
 
 def create_stats_schema_and_table(cursor):
     """Create stats schema and table if they don't exist"""
@@ -94,36 +93,47 @@ def create_stats_schema_and_table(cursor):
     except Exception as e:
         print(f"Error creating schema/table: {e}")
 
+def leaderboard_row(df, stats_df):
+    """Leaderboard summary of one strategy from its backtest rows and generated stats."""
+    last = df.iloc[-1]
+    stats = stats_df.iloc[0] if not stats_df.empty else {}
+    return {
+        "pnl_sum": last["pnl_sum"],
+        "balance": last["balance"],
+        "sharpe_ratio": stats.get("sharpe_ratio"),
+        "max_drawdown": stats.get("max_drawdown"),
+        "number_of_trades": stats.get("number_of_trades"),
+        "last_trade_at": last["datetime"],
+    }
+
 def main():
-    pg = PostgresConnection()
-    engine = pg.get_engine()
-    cursor = pg.get_cursor()
+    db = DatabaseManager()
     
     try:
-        create_stats_schema_and_table(cursor)
-        cursor.execute("SELECT name FROM public.strategies_config")
-        strategy_names = [row[0] for row in cursor.fetchall()]
-        print(f"Found {len(strategy_names)} strategies to process")
-        cursor.execute("DELETE FROM stats.strategy_stats")
-        print("Cleared existing stats")
+        create_stats_schema_and_table(db.cursor)
+        # Only strategies whose backtest was saved since their last summary
+        stale = db.fetch_stale_leaderboard()
+        print(f"Found {len(stale)} strategies with new backtests to process")
         
-        for i, strategy in enumerate(strategy_names, 1):
+        for i, (strategy, version) in enumerate(stale, 1):
             try:
-                print(f"Processing strategy {i}/{len(strategy_names)}: {strategy}")
-                df = pd.read_sql(f'SELECT * FROM backtest."{strategy}"', engine)
+                print(f"Processing strategy {i}/{len(stale)}: {strategy}")
+                df = db.fetch_backtest_results(strategy)
+                # Replace, not append to, the strategy's previous stats
+                db.clear_strategy_stats(strategy)
                 
                 if df.empty:
                     print(f"No data found for strategy: {strategy}")
+                    db.save_leaderboard_row(strategy, {}, version)
                     continue
                 
                 stats_df = generate_stats_from_backtest(df)
                 
                 if stats_df.empty:
                     print(f"No stats generated for strategy: {strategy}")
-                    continue
-                
-                stats_df["strategy_name"] = strategy
-                stats_df.to_sql("strategy_stats", engine, schema="stats", if_exists="append", index=False)
+                else:
+                    db.save_strategy_stats(stats_df, strategy)
+                db.save_leaderboard_row(strategy, leaderboard_row(df, stats_df), version)
                 print(f"Successfully processed strategy: {strategy}")
             except Exception as e:
                 print(f"Failed for {strategy}: {e}")
@@ -133,7 +143,7 @@ def main():
     except Exception as e:
         print(f"Error in main execution: {e}")
     finally:
-        pg.close()
+        db.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -40,12 +40,8 @@ if __name__ == "__main__":
         # Download and resample data
 
         downloader = DataDownloader()
-        df_1m = downloader.download(strategy['exchange'], strategy['symbol'], "1m", config['start_date'], config['end_date'])
-        print(df_1m.shape)
-        if strategy['time_horizon'] != "1m":
-            df = downloader.resample(df_1m, strategy['time_horizon'])
-        else:
-            df = df_1m
+        df = downloader.download_horizon(strategy['exchange'], strategy['symbol'], strategy['time_horizon'], config['start_date'], config['end_date'])
+        print(df.shape)
         
         if df is not None and not df.empty:
             # Ensure 'datetime' is a column, not just index
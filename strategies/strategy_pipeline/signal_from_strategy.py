@@ -1,24 +1,20 @@
 import os
 import pandas as pd
-from sqlalchemy import create_engine, text, MetaData, Table, Column, String, DateTime, Integer
+from sqlalchemy import text, MetaData, Table, Column, String, DateTime, Integer
 from dotenv import load_dotenv
-from collections import Counter
 from data.downloader.data_downloader import DataDownloader
+from data.utils.pg_pool import get_engine
 from indicator.indicator_calculator import IndicatorCalculator
 from signals.technical_indicator_signal.signal_generator import SignalGenerator
+from strategies.strategy_pipeline.signal_processor import vote_signals
 from strategies.strategy_pipeline.utils.indicator_utils import get_all_indicator_configs
 import random
 import configparser
 import datetime
 
-# --- Load DB credentials from .env ---
+# --- Shared pooled engine (credentials from .env) ---
 load_dotenv()
-user = os.getenv("PG_USER")
-password = os.getenv("PG_PASSWORD")
-host = os.getenv("PG_HOST")
-port = os.getenv("PG_PORT")
-db = os.getenv("PG_DB")
-engine = create_engine(f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{db}")
+engine = get_engine()
 
 # --- Load strategy config for date range ---
 config_path = os.path.join(os.path.dirname(_file_), 'strategy_config.ini')
@@ -107,15 +103,7 @@ for strat in strategies:
     signal_df = sg.generate_signals()
     # Voting (mode) for each row
     signal_cols = [col for col in signal_df.columns if col.startswith('signal_')]
-    voted_signals = []
-    for i, row in signal_df.iterrows():
-        votes = [row[col] for col in signal_cols]
-        count = Counter(votes)
-        most_common = count.most_common()
-        if len(most_common) > 1 and most_common[0][1] == most_common[1][1]:
-            voted_signals.append(0)  # Tie fallback
-        else:
-            voted_signals.append(most_common[0][0])
+    voted_signals = vote_signals(signal_df[signal_cols].to_numpy())
     # Create a table for this strategy in the signals schema
     strat_signals_table = Table(
         strategy_name, metadata,
@@ -1,6 +1,19 @@
 import pandas as pd
 import numpy as np
-from collections import Counter
+
+VOTE_VALUES = np.array([-1, 0, 1], dtype=np.int8)
+
+def vote_signals(signal_matrix):
+    """
+    Majority vote across signal columns (rows = bars, columns = indicators).
+    Counts the -1/0/1 votes of every row with NumPy reductions; when two or more
+    values share the highest count the row falls back to 0, like Counter.most_common ties.
+    """
+    signal_matrix = np.asarray(signal_matrix).astype(np.int8, copy=False)
+    counts = np.stack([(signal_matrix == value).sum(axis=1) for value in VOTE_VALUES], axis=1)
+    top_count = counts.max(axis=1)
+    is_tie = (counts == top_count[:, None]).sum(axis=1) > 1
+    return np.where(is_tie, np.int8(0), VOTE_VALUES[counts.argmax(axis=1)])
 
 class SignalProcessor:
     def process_signals(self, df_signals, strategy_name):
@@ -25,17 +38,7 @@ class SignalProcessor:
             return pd.DataFrame(columns=['datetime', 'final_signal'])
 
         # Voting mechanism: Use mode across signal columns with tie handling
-        final_signals = []
-        for _, row in signal_df.iterrows():
-            votes = [row[col] for col in signal_cols]
-            count = Counter(votes)
-            most_common = count.most_common()
-            if len(most_common) > 1 and most_common[0][1] == most_common[1][1]:
-                final_signals.append(0)  # Tie fallback
-            else:
-                final_signals.append(most_common[0][0])
-
-        final_signals = pd.Series(final_signals, index=signal_df.index)
+        final_signals = pd.Series(vote_signals(signal_df[signal_cols].to_numpy()), index=signal_df.index)
 
         # Create output DataFrame with datetime and final_signal
         strategy_signals = pd.DataFrame({
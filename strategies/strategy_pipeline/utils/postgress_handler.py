@@ -1,18 +1,175 @@
 #strategies/strategy_pipeline/utils/postgress_handler.py
+import os
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from strategies.strategy_pipeline.utils.indicator_utils import INDICATORS
-from strategies.strategy_pipeline.utils.postgress_connection import PostgresConnection
+from data.utils.postgress_dataSave import DatabaseManager as CandleDatabaseManager
 
-class DatabaseManager:
-    def __init__(self):
-        # Initialize PostgresConnection
-        self.pg_conn = PostgresConnection()
-        self.engine = self.pg_conn.get_engine()
-        self.cursor = self.pg_conn.get_cursor()
-        self.conn = self.pg_conn.get_connection()
+# Schemas the strategy side writes to; created together on first use in a process
+STRATEGY_SCHEMAS = ("strategy_signal", "backtest", "stats")
+
+# "tables": one strategy_signal."<name>" / backtest."<name>" table per strategy.
+# "partitioned": every strategy in the hash-partitioned long tables below.
+STORAGE_MODES = ("tables", "partitioned")
+SIGNALS_TABLE = "strategy_signal.signals"
+TRADES_TABLE = "backtest.trades"
+SIGNAL_COLUMNS = {
+    "datetime": "TIMESTAMP NOT NULL",
+    "final_signal": "SMALLINT",
+}
+TRADE_COLUMNS = {
+    "datetime": "TIMESTAMP NOT NULL",
+    "action": "TEXT",
+    "buy_price": "DOUBLE PRECISION",
+    "sell_price": "DOUBLE PRECISION",
+    "pnl_percent": "DOUBLE PRECISION",
+    "pnl_sum": "DOUBLE PRECISION",
+    "balance": "DOUBLE PRECISION",
+}
+LEADERBOARD_TABLE = "stats.strategy_leaderboard"
+# Summary columns kept per strategy; the stats job fills them, backtest saves mark rows stale
+LEADERBOARD_COLUMNS = ["pnl_sum", "balance", "sharpe_ratio", "max_drawdown", "number_of_trades", "last_trade_at"]
+
+class DatabaseManager(CandleDatabaseManager):
+    """
+    Strategy-side data access on top of the candle DatabaseManager: one pooled
+    connection, schema/table DDL cached per process, and COPY-based bulk writes for
+    signals and backtest results.
+
+    `storage` (default: env STRATEGY_STORAGE, else "tables") picks where signals and
+    backtest trades live. In "partitioned" mode they go to strategy_signal.signals and
+    backtest.trades, keyed by strategy_id (the strategy name) and hash-partitioned into
+    STRATEGY_PARTITIONS partitions, so cross-strategy reads are one indexed scan and
+    the catalog does not grow with the number of strategies.
+    """
+
+    def __init__(self, storage=None):
+        super().__init__()
+        self.storage = (storage or os.getenv("STRATEGY_STORAGE", "tables")).lower()
+        if self.storage not in STORAGE_MODES:
+            raise ValueError(f"Unknown strategy storage mode '{self.storage}', expected one of {STORAGE_MODES}")
+        self.pg_conn.ensure_schemas(*STRATEGY_SCHEMAS)
+        self.pg_conn.ensure_table(
+            LEADERBOARD_TABLE,
+            f"""
+            CREATE TABLE IF NOT EXISTS {LEADERBOARD_TABLE} (
+                strategy_name VARCHAR(50) PRIMARY KEY,
+                pnl_sum DOUBLE PRECISION,
+                balance DOUBLE PRECISION,
+                sharpe_ratio DOUBLE PRECISION,
+                max_drawdown DOUBLE PRECISION,
+                number_of_trades INTEGER,
+                last_trade_at TIMESTAMP,
+                backtest_updated_at TIMESTAMP DEFAULT now(),
+                stats_updated_at TIMESTAMP
+            )
+            """
+        )
+        if self.storage == "partitioned":
+            self._ensure_long_tables()
+
+    def _ensure_long_tables(self):
+        """Create both long tables, their partitions and (strategy_id, datetime) indexes in one batch."""
+        partitions = int(os.getenv("STRATEGY_PARTITIONS", "16"))
+        statements = []
+        for qualified_table, columns in ((SIGNALS_TABLE, SIGNAL_COLUMNS), (TRADES_TABLE, TRADE_COLUMNS)):
+            if self.pg_conn.is_known(qualified_table):
+                continue
+            table_name = qualified_table.split(".")[1]
+            definitions = ", ".join(f"{col} {col_type}" for col, col_type in columns.items())
+            statements.append(
+                f"CREATE TABLE IF NOT EXISTS {qualified_table} (strategy_id VARCHAR(50) NOT NULL, {definitions}) "
+                f"PARTITION BY HASH (strategy_id)"
+            )
+            statements += [
+                f"CREATE TABLE IF NOT EXISTS {qualified_table}_p{i} PARTITION OF {qualified_table} "
+                f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {i})"
+                for i in range(partitions)
+            ]
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS {table_name}_strategy_datetime_idx ON {qualified_table} (strategy_id, datetime)"
+            )
+        if statements:
+            self.cursor.execute("; ".join(statements))
+            self.pg_conn.mark_known(SIGNALS_TABLE)
+            self.pg_conn.mark_known(TRADES_TABLE)
+
+    def _long_frame(self, frames, columns):
+        """Stack {strategy_name: frame} into one frame with a leading strategy_id column."""
+        parts = []
+        for strategy_name, df in frames.items():
+            if df.index.name == 'datetime':
+                df = df.reset_index()
+            part = df[list(columns)].copy()
+            part.insert(0, "strategy_id", strategy_name)
+            parts.append(part)
+        return pd.concat(parts, ignore_index=True)
+
+    def _replace_strategy_rows(self, qualified_table, frames, columns):
+        """
+        Replace the rows of every strategy in `frames` ({strategy_name: frame}) in a long
+        table: one DELETE for all of them and one COPY stream, in a single transaction.
+        """
+        df = self._long_frame(frames, columns)
+        try:
+            self.cursor.execute(
+                f"BEGIN; DELETE FROM {qualified_table} WHERE strategy_id = ANY(%s)",
+                (list(frames),)
+            )
+            self._copy_frame(df, qualified_table)
+            self._commit(list(frames) if qualified_table == TRADES_TABLE else ())
+        except Exception:
+            self._rollback()
+            raise
+
+    def _rollback(self):
+        """
+        ROLLBACK after a failure anywhere between BEGIN and COMMIT, so the autocommit
+        session is not left in an aborted transaction. A failing ROLLBACK (e.g. the
+        connection itself dropped) is reported but does not mask the original error.
+        """
+        try:
+            self.cursor.execute("ROLLBACK")
+        except Exception as e:
+            print(f"ROLLBACK failed: {e}")
+
+    def _commit(self, changed_backtests=()):
+        """
+        COMMIT the open transaction. Strategies in `changed_backtests` get their
+        leaderboard row stamped as stale in the same round trip, so the stats job only
+        recomputes those.
+        """
+        if not changed_backtests:
+            self.cursor.execute("COMMIT")
+            return
+        self.cursor.execute(
+            f"""
+            INSERT INTO {LEADERBOARD_TABLE} (strategy_name, backtest_updated_at)
+            SELECT name, now() FROM unnest(%s) AS name
+            ON CONFLICT (strategy_name) DO UPDATE SET backtest_updated_at = EXCLUDED.backtest_updated_at;
+            COMMIT
+            """,
+            (list(changed_backtests),)
+        )
+
+    def _replace_table(self, df: pd.DataFrame, schema: str, table_name: str):
+        """
+        Swap `schema.table_name` for the contents of `df` in one transaction: the DROP and
+        CREATE go in a single statement batch, the rows in a single COPY stream.
+        """
+        qualified_table = f'{schema}."{table_name}"'
+        try:
+            self.cursor.execute(
+                f"BEGIN; DROP TABLE IF EXISTS {qualified_table}; "
+                f"CREATE TABLE {qualified_table} ({self._column_definitions(df)})"
+            )
+            self._copy_frame(df, qualified_table)
+            self._commit([table_name] if schema == "backtest" else ())
+        except Exception:
+            self._rollback()
+            raise
 
-    
     def create_strategies_table(self):
         window_indicators = [
             'sma', 'ema', 'wma', 'dema', 'tema', 'trima', 'kama', 't3', 'midpoint', 'bbands',
@@ -26,8 +183,9 @@ class DatabaseManager:
             if ind in window_indicators:
                 column_definitions.append(f"{ind}_window INTEGER DEFAULT 0")
         
-        with self.engine.connect() as conn:
-            create_table_query = f"""
+        created = self.pg_conn.ensure_table(
+            "public.strategies_config",
+            f"""
                 CREATE TABLE IF NOT EXISTS public.strategies_config (
                     name VARCHAR(50) PRIMARY KEY,
                     exchange VARCHAR(50),
@@ -38,9 +196,9 @@ class DatabaseManager:
                     {', '.join(column_definitions)}
                 )
             """
-            conn.execute(text(create_table_query))
-            conn.commit()
-        print("Strategies_config table exists in public schema.")
+        )
+        if created:
+            print("Strategies_config table exists in public schema.")
 
     
     def save_strategies(self, strategies):
@@ -65,19 +223,8 @@ class DatabaseManager:
             except Exception as e:
                 return 0
             
-    def save_signals(self, df_signals, strategy_name):
+    def save_signals(self, df_signals: pd.DataFrame, strategy_name: str):
         """Save the signal DataFrame to the strategy_signal schema with the strategy_name as the table name."""
-        # Create strategy_signal schema if it doesn't exist
-        with self.engine.connect() as conn:
-            self.cursor.execute(
-                "SELECT EXISTS (SELECT 1 FROM pg_namespace WHERE nspname = 'strategy_signal')"
-            )
-            schema_exists = self.cursor.fetchone()[0]
-            if not schema_exists:
-                print("Creating schema: strategy_signal")
-                self.cursor.execute("CREATE SCHEMA strategy_signal")
-                conn.commit()
-
         # Ensure datetime is a column
         if df_signals.index.name == 'datetime':
             df_signals = df_signals.reset_index()
@@ -89,16 +236,13 @@ class DatabaseManager:
             return
 
         # Save to database
+        if self.storage == "partitioned":
+            print(f"Saving signals for {strategy_name} to table: {SIGNALS_TABLE}")
+            self._replace_strategy_rows(SIGNALS_TABLE, {strategy_name: df_signals}, SIGNAL_COLUMNS)
+            return
         table_name = strategy_name
         print(f"Saving signals to table: strategy_signal.{table_name}")
-        df_signals.to_sql(
-            table_name,
-            self.engine,
-            schema='strategy_signal',
-            if_exists='replace',  # Replace existing table; use 'append' if you want to add data
-            index=False,
-            method='multi'
-        )
+        self._replace_table(df_signals, 'strategy_signal', table_name)
         print(f"Signals saved to strategy_signal.{table_name} successfully.")
     
     def fetch_ohlcv_data(self, exchange: str, symbol: str, time_horizon: str) -> pd.DataFrame:
@@ -123,6 +267,12 @@ class DatabaseManager:
         """
         Fetch signals from strategy_signal.<strategy_name> table.
         """
+        if self.storage == "partitioned":
+            print(f"Fetching signals for {strategy_name} from table: {SIGNALS_TABLE}")
+            return pd.read_sql(
+                text(f"SELECT datetime, final_signal FROM {SIGNALS_TABLE} WHERE strategy_id = :name ORDER BY datetime"),
+                self.engine, params={"name": strategy_name}, parse_dates=["datetime"]
+            )
         table = f"strategy_signal.{strategy_name}"
 
         query = f"""
@@ -153,21 +303,10 @@ class DatabaseManager:
                 raise ValueError(f"Strategy '{strategy_name}' not found in strategies_config.")
 
             
-    def save_backtest_results(self, df_results, strategy_name):
+    def save_backtest_results(self, df_results: pd.DataFrame, strategy_name: str):
         """
         Save the backtest results DataFrame to the 'backtest' schema with the strategy_name as the table name.
         """
-        # Create backtest schema if it doesn't exist
-        with self.engine.connect() as conn:
-            self.cursor.execute(
-                "SELECT EXISTS (SELECT 1 FROM pg_namespace WHERE nspname = 'backtest')"
-            )
-            schema_exists = self.cursor.fetchone()[0]
-            if not schema_exists:
-                print("Creating schema: backtest")
-                self.cursor.execute("CREATE SCHEMA backtest")
-                conn.commit()
-
         # Ensure datetime is a column
         if df_results.index.name == 'datetime':
             df_results = df_results.reset_index()
@@ -179,25 +318,137 @@ class DatabaseManager:
             return
 
         # Save to database
+        if self.storage == "partitioned":
+            print(f"Saving backtest results for {strategy_name} to table: {TRADES_TABLE}")
+            self._replace_strategy_rows(TRADES_TABLE, {strategy_name: df_results}, TRADE_COLUMNS)
+            return
         table_name = strategy_name
         print(f"Saving backtest results to table: backtest.{table_name}")
-        df_results.to_sql(
-            table_name,
-            self.engine,
-            schema='backtest',
-            if_exists='replace',  
-            index=False,
-            method='multi'
-        )
+        self._replace_table(df_results, 'backtest', table_name)
         print(f"Backtest results saved to backtest.{table_name} successfully.")
 
+    def save_signals_bulk(self, frames: dict):
+        """Save {strategy_name: signal frame} at once; one DELETE and one COPY in partitioned mode."""
+        if self.storage != "partitioned":
+            for strategy_name, df_signals in frames.items():
+                self.save_signals(df_signals, strategy_name)
+            return
+        print(f"Saving signals for {len(frames)} strategies to table: {SIGNALS_TABLE}")
+        self._replace_strategy_rows(SIGNALS_TABLE, frames, SIGNAL_COLUMNS)
 
+    def save_backtest_results_bulk(self, frames: dict):
+        """Save {strategy_name: backtest results frame} at once; one DELETE and one COPY in partitioned mode."""
+        if self.storage != "partitioned":
+            for strategy_name, df_results in frames.items():
+                self.save_backtest_results(df_results, strategy_name)
+            return
+        print(f"Saving backtest results for {len(frames)} strategies to table: {TRADES_TABLE}")
+        self._replace_strategy_rows(TRADES_TABLE, frames, TRADE_COLUMNS)
 
-    def close(self):
-        """Close database connections and dispose of the engine."""
-        self.cursor.close()
-        self.conn.close()
-        self.engine.dispose()
+    def fetch_backtest_results(self, strategy_name: str) -> pd.DataFrame:
+        """Fetch the rows of backtest.<strategy_name>, oldest first."""
+        if self.storage == "partitioned":
+            return pd.read_sql(
+                text(f"SELECT {', '.join(TRADE_COLUMNS)} FROM {TRADES_TABLE} WHERE strategy_id = :name ORDER BY datetime"),
+                self.engine, params={"name": strategy_name}, parse_dates=["datetime"]
+            )
+        return pd.read_sql(
+            f'SELECT * FROM backtest."{strategy_name}" ORDER BY datetime', self.engine, parse_dates=["datetime"]
+        )
 
+    def fetch_all_backtest_results(self) -> pd.DataFrame:
+        """Every strategy's backtest rows with a strategy_id column (partitioned mode only)."""
+        if self.storage != "partitioned":
+            raise ValueError("fetch_all_backtest_results needs STRATEGY_STORAGE=partitioned")
+        return pd.read_sql(
+            f"SELECT strategy_id, {', '.join(TRADE_COLUMNS)} FROM {TRADES_TABLE} ORDER BY strategy_id, datetime",
+            self.engine, parse_dates=["datetime"]
+        )
 
+    def migrate_to_partitioned(self):
+        """
+        Copy the per-strategy signal and backtest tables of every strategy in
+        strategies_config into the long tables. The old tables are left in place;
+        drop them once the partitioned mode has been verified.
+        """
+        self._ensure_long_tables()
+        self.cursor.execute(
+            "SELECT table_schema, table_name FROM information_schema.tables "
+            "WHERE table_schema IN ('strategy_signal', 'backtest') "
+            "AND table_name IN (SELECT name FROM public.strategies_config)"
+        )
+        for schema, table_name in self.cursor.fetchall():
+            qualified_table, columns = (SIGNALS_TABLE, SIGNAL_COLUMNS) if schema == "strategy_signal" else (TRADES_TABLE, TRADE_COLUMNS)
+            column_list = ", ".join(columns)
+            try:
+                self.cursor.execute(
+                    f"BEGIN; DELETE FROM {qualified_table} WHERE strategy_id = %s; "
+                    f'INSERT INTO {qualified_table} (strategy_id, {column_list}) SELECT %s, {column_list} FROM {schema}."{table_name}"; '
+                    f"COMMIT",
+                    (table_name, table_name)
+                )
+                print(f"Migrated {schema}.{table_name} into {qualified_table}")
+            except Exception as e:
+                self._rollback()
+                print(f"Failed to migrate {schema}.{table_name}: {e}")
+
+    def fetch_strategy_names(self) -> list:
+        """Names of all strategies in strategies_config."""
+        self.cursor.execute("SELECT name FROM public.strategies_config")
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def clear_strategy_stats(self, strategy_name: str = None):
+        """Delete the stats rows of one strategy, or of all strategies."""
+        # The table is created by the first to_sql append, so it may not exist yet
+        if not self.pg_conn.is_known("stats.strategy_stats"):
+            self.cursor.execute("SELECT to_regclass('stats.strategy_stats') IS NOT NULL")
+            if not self.cursor.fetchone()[0]:
+                return
+            self.pg_conn.mark_known("stats.strategy_stats")
+        if strategy_name is None:
+            self.cursor.execute("DELETE FROM stats.strategy_stats")
+        else:
+            self.cursor.execute("DELETE FROM stats.strategy_stats WHERE strategy_name = %s", (strategy_name,))
+
+    def save_strategy_stats(self, df_stats: pd.DataFrame, strategy_name: str):
+        """Append one strategy's stats rows to stats.strategy_stats."""
+        df_stats = df_stats.assign(strategy_name=strategy_name)
+        df_stats.to_sql("strategy_stats", self.engine, schema="stats", if_exists="append", index=False, method="multi")
 
+    def fetch_stale_leaderboard(self) -> list:
+        """
+        Strategies whose leaderboard row is missing or older than their last backtest
+        save, as (strategy_name, version) pairs; `version` is the backtest save time, or
+        now for strategies never summarized. Also drops leaderboard rows of strategies
+        no longer in strategies_config.
+        """
+        self.cursor.execute(
+            f"DELETE FROM {LEADERBOARD_TABLE} WHERE strategy_name NOT IN (SELECT name FROM public.strategies_config)"
+        )
+        self.cursor.execute(
+            f"""
+            SELECT c.name, COALESCE(l.backtest_updated_at, now())
+            FROM public.strategies_config c
+            LEFT JOIN {LEADERBOARD_TABLE} l ON l.strategy_name = c.name
+            WHERE l.stats_updated_at IS NULL OR l.stats_updated_at < l.backtest_updated_at
+            """
+        )
+        return self.cursor.fetchall()
+
+    def save_leaderboard_row(self, strategy_name: str, row: dict, version):
+        """
+        Upsert one strategy's leaderboard summary (LEADERBOARD_COLUMNS). The row is
+        stamped with the `version` from fetch_stale_leaderboard, so a backtest saved
+        while the stats job runs leaves it stale for the next run.
+        """
+        # NumPy scalars -> Python values for psycopg2
+        values = [row[col].item() if isinstance(row.get(col), np.generic) else row.get(col) for col in LEADERBOARD_COLUMNS]
+        updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in LEADERBOARD_COLUMNS)
+        self.cursor.execute(
+            f"""
+            INSERT INTO {LEADERBOARD_TABLE} (strategy_name, {", ".join(LEADERBOARD_COLUMNS)}, backtest_updated_at, stats_updated_at)
+            VALUES (%s, {", ".join(["%s"] * len(LEADERBOARD_COLUMNS))}, %s, %s)
+            ON CONFLICT (strategy_name) DO UPDATE SET {updates}, stats_updated_at = EXCLUDED.stats_updated_at
+            """,
+            [strategy_name] + values + [version, version]
+        )